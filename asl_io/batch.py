@@ -0,0 +1,99 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import os
+import gc
+import json
+import time
+import multiprocessing
+from write import write_nl
+
+def _write_scenario(task):
+    # build and write one scenario in a worker process; only the
+    # file names go back to the parent, never the model
+    (create_model, i, params, nl_filename, symbol_map_format,
+     symbol_map_cache, kwds) = task
+    start = time.time()
+    model = create_model(**params)
+    symbol_map_filename = write_nl(model, nl_filename,
+                                   symbol_map_format=symbol_map_format,
+                                   symbol_map_cache=symbol_map_cache,
+                                   **kwds)
+    del model
+    gc.collect()
+    return {"scenario": i,
+            "params": params,
+            "nl_file": nl_filename,
+            "symbol_map_file": symbol_map_filename,
+            "time": time.time() - start}
+
+def write_nl_batch(create_model, scenarios, directory, processes=None,
+                   symbol_map_format="pickle", symbol_map_cache=None,
+                   maxtasksperchild=20, **kwds):
+    """
+    Builds a model for every scenario and writes its NL file
+    and symbol map to directory, using a pool of processes.
+    create_model is called with the keyword arguments in each
+    entry of scenarios; it must be a module-level function so
+    that it can be sent to the worker processes. Workers are
+    replaced after maxtasksperchild scenarios, which keeps
+    their memory bounded. The other keywords are passed on to
+    write_nl.
+
+    Returns the manifest: one dictionary per scenario, in
+    scenario order, with the parameters, the NL file, the
+    symbol map file and the time taken. The manifest is also
+    saved to manifest.json in directory.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    tasks = [(create_model, i, params,
+              os.path.join(directory, "scenario_%d.nl" % i),
+              symbol_map_format, symbol_map_cache, kwds)
+             for i, params in enumerate(scenarios)]
+    if processes is None:
+        processes = os.cpu_count()
+    processes = max(1, min(processes, len(tasks)))
+
+    pool = multiprocessing.Pool(processes,
+                                maxtasksperchild=maxtasksperchild)
+    try:
+        # small chunks keep all the workers busy until the end
+        chunksize = max(1, len(tasks) // (4*processes))
+        manifest = list(pool.imap_unordered(_write_scenario, tasks,
+                                            chunksize=chunksize))
+    finally:
+        pool.close()
+        pool.join()
+    manifest.sort(key=lambda entry: entry["scenario"])
+
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+if __name__ == "__main__":
+    import sys
+    from script import create_model
+
+    # Usage: python batch.py [scenarios] [processes]
+    nscenarios = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    scenarios = [{"lower": 1.0 + i} for i in range(nscenarios)]
+    start = time.time()
+    manifest = write_nl_batch(create_model, scenarios, "scenarios",
+                              processes=processes,
+                              symbol_map_cache="scenarios")
+    elapsed = time.time() - start
+    print("Wrote %d NL files in %.2f seconds (%.1f per second)"
+          % (len(manifest), elapsed, len(manifest) / elapsed))
+    print("Symbol map files: %s"
+          % (sorted(set(e["symbol_map_file"] for e in manifest))))
@@ -0,0 +1,87 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import os
+import sys
+import time
+import tempfile
+from pyomo.environ import *
+from write import write_nl
+from read import read_sol, load_sol
+
+def create_large_model(n):
+    """
+    Creates a model with n variables indexed by (integer, string)
+    pairs and one constraint for every ten variables.
+    """
+    model = ConcreteModel()
+    model.I = RangeSet(0, n//10-1)
+    model.J = Set(initialize=["s%d" % j for j in range(10)])
+    model.x = Var(model.I, model.J, bounds=(0, None))
+    model.o = Objective(expr=sum_product(model.x))
+    model.c = Constraint(model.I, rule=lambda m, i:
+                         sum(m.x[i, j] for j in m.J) >= 1)
+    return model
+
+def write_sol(sol_filename, nvars, ncons):
+    """
+    Writes an SOL file with a value for every variable and
+    constraint, as a solver would.
+    """
+    with open(sol_filename, "w") as f:
+        f.write("benchmark\n\nOptions\n3\n1\n1\n0\n")
+        f.write("%d\n%d\n%d\n%d\n" % (ncons, ncons, nvars, nvars))
+        f.write("1.0\n" * ncons)
+        f.write("0.1\n" * nvars)
+        f.write("objno 0 0\n")
+
+def time_format(n, symbol_map_format, directory):
+    """
+    Returns the time to write the NL file and symbol map, the
+    size of the symbol map file, the time to read the SOL file
+    and load it into a new model, and the time to do the same
+    with load_sol.
+    """
+    nl_filename = os.path.join(directory, "bench_%s.nl" % symbol_map_format)
+    model = create_large_model(n)
+    start = time.time()
+    symbol_map_filename = write_nl(model, nl_filename,
+                                   symbol_map_format=symbol_map_format)
+    write_time = time.time() - start
+
+    sol_filename = nl_filename[:-3] + ".sol"
+    write_sol(sol_filename, len(model.x), len(model.c))
+    model = create_large_model(n)
+    start = time.time()
+    results = read_sol(model, sol_filename, symbol_map_filename)
+    model.solutions.load_from(results)
+    read_time = time.time() - start
+
+    model = create_large_model(n)
+    start = time.time()
+    load_sol(model, sol_filename, symbol_map_filename)
+    load_time = time.time() - start
+    return (write_time, os.path.getsize(symbol_map_filename), read_time,
+            load_time)
+
+if __name__ == "__main__":
+    # Usage: python benchmark.py [variables ...]
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000]
+    print("%10s %10s %12s %12s %12s %12s" % ("Variables", "Format",
+                                             "Write", "Map size",
+                                             "Read+load", "load_sol"))
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            for symbol_map_format in ("pickle", "columnar"):
+                times = time_format(n, symbol_map_format, directory)
+                print("%10d %10s %12.3f %12d %12.3f %12.3f" % (
+                    (n, symbol_map_format) + times))
@@ -0,0 +1,162 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+"""
+A stand-in for an ASL solver, for testing the asl_io tools on
+machines without one. It reads a linear NL file written in text
+format, solves it with scipy.optimize.linprog (HiGHS) and writes
+the SOL file with primal and dual values. Like ASL solvers it is
+called as
+
+    python lp_solver.py stub -AMPL
+
+and writes stub.sol.
+"""
+
+import sys
+import numpy
+import scipy.optimize
+import scipy.sparse
+
+def read_bounds(lines, start, count, lower, upper):
+    # the r and b segments: one line per row or column, starting
+    # with the bound type
+    for i in range(count):
+        t = lines[start+i].split()
+        kind = int(t[0])
+        if kind == 0:
+            lower[i], upper[i] = float(t[1]), float(t[2])
+        elif kind == 1:
+            upper[i] = float(t[1])
+        elif kind == 2:
+            lower[i] = float(t[1])
+        elif kind == 4:
+            lower[i] = upper[i] = float(t[1])
+    return start + count
+
+def read_nl(nl_filename):
+    """
+    Reads a linear NL file and returns a dictionary with the
+    objective, the constraint matrix and the bounds.
+    """
+    with open(nl_filename) as f:
+        lines = f.read().split("\n")
+    if not lines[0].startswith("g"):
+        raise ValueError("Only text NL files are supported")
+    header = [line.split("#")[0].split() for line in lines[:10]]
+    n, m = int(header[1][0]), int(header[1][1])
+    if int(header[2][0]) or int(header[2][1]):
+        raise ValueError("Only linear NL files are supported")
+    ndiscrete = int(header[6][0]) + int(header[6][1])
+    nl = {"c": numpy.zeros(n), "sense": 0,
+          "row_lower": numpy.full(m, -numpy.inf),
+          "row_upper": numpy.full(m, numpy.inf),
+          "lower": numpy.full(n, -numpy.inf),
+          "upper": numpy.full(n, numpy.inf),
+          "integrality": numpy.zeros(n)}
+    # discrete variables come last in an NL file
+    if ndiscrete:
+        nl["integrality"][n-ndiscrete:] = 1
+    rows, cols, values = [], [], []
+
+    i = 10
+    while i < len(lines):
+        t = lines[i].split("#")[0].split()
+        i += 1
+        if not t:
+            continue
+        segment = t[0][0]
+        if segment in "CO":
+            # linear bodies are just a constant
+            if segment == "O":
+                nl["sense"] = int(t[1])
+            i += 1
+        elif segment in "xdk":
+            i += int(t[0][1:]) if len(t[0]) > 1 else int(t[1])
+        elif segment == "r":
+            i = read_bounds(lines, i, m, nl["row_lower"], nl["row_upper"])
+        elif segment == "b":
+            i = read_bounds(lines, i, n, nl["lower"], nl["upper"])
+        elif segment in "JG":
+            for j in range(int(t[1])):
+                col, value = lines[i+j].split()
+                if segment == "J":
+                    rows.append(int(t[0][1:]))
+                    cols.append(int(col))
+                    values.append(float(value))
+                else:
+                    nl["c"][int(col)] = float(value)
+            i += int(t[1])
+        else:
+            raise ValueError("Unsupported NL segment '%s'" % (t[0]))
+    nl["A"] = scipy.sparse.csr_matrix((values, (rows, cols)), shape=(m, n))
+    return nl
+
+def solve(nl):
+    """
+    Solves the problem read by read_nl. Returns the linprog
+    result and the constraint duals.
+    """
+    A = nl["A"]
+    sign = -1.0 if nl["sense"] == 1 else 1.0
+    equal = nl["row_lower"] == nl["row_upper"]
+    upper = numpy.isfinite(nl["row_upper"]) & ~equal
+    lower = numpy.isfinite(nl["row_lower"]) & ~equal
+    A_ub = scipy.sparse.vstack([A[upper], -A[lower]])
+    b_ub = numpy.concatenate([nl["row_upper"][upper],
+                              -nl["row_lower"][lower]])
+    result = scipy.optimize.linprog(
+        sign * nl["c"],
+        A_ub=A_ub if A_ub.shape[0] else None,
+        b_ub=b_ub if A_ub.shape[0] else None,
+        A_eq=A[equal] if equal.any() else None,
+        b_eq=nl["row_lower"][equal] if equal.any() else None,
+        bounds=numpy.column_stack([nl["lower"], nl["upper"]]),
+        integrality=nl["integrality"], method="highs")
+
+    # duals are the change in the objective per unit change in
+    # the row bounds; a MIP has none
+    dual = numpy.zeros(A.shape[0])
+    if result.status == 0 and not nl["integrality"].any():
+        nupper = upper.sum()
+        dual[upper] += result.ineqlin.marginals[:nupper]
+        dual[lower] -= result.ineqlin.marginals[nupper:]
+        if equal.any():
+            dual[equal] += result.eqlin.marginals
+        dual *= sign
+    return result, dual
+
+def write_sol(sol_filename, message, primal, dual, solve_result_num):
+    """
+    Writes an SOL file in text format.
+    """
+    with open(sol_filename, "w") as f:
+        f.write("%s\n\nOptions\n3\n1\n1\n0\n" % (message))
+        f.write("%d\n%d\n%d\n%d\n" % (len(dual), len(dual),
+                                      len(primal), len(primal)))
+        f.write("".join("%r\n" % v for v in dual.tolist()))
+        f.write("".join("%r\n" % v for v in primal.tolist()))
+        f.write("objno 0 %d\n" % (solve_result_num))
+
+if __name__ == "__main__":
+    stub = sys.argv[1]
+    if stub.endswith(".nl"):
+        stub = stub[:-3]
+    nl = read_nl(stub+".nl")
+    result, dual = solve(nl)
+    # map the linprog status to an AMPL solve_result_num
+    solve_result_num = {0: 0, 1: 400, 2: 200, 3: 300}.get(result.status,
+                                                          500)
+    primal = result.x if result.x is not None else \
+        numpy.zeros(len(nl["c"]))
+    write_sol(stub+".sol", "lp_solver: %s" % (result.message),
+              primal, dual, solve_result_num)
+    print("lp_solver: %s" % (result.message))
@@ -0,0 +1,260 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import os
+import math
+import shutil
+import weakref
+import numpy
+from pyomo.common.collections import ComponentMap
+from pyomo.environ import value
+from read import components_in_order
+
+# In a template every number that can be patched is padded to
+# NUMBER_WIDTH characters, which is enough for the repr of any
+# float, and every bounds line to LINE_WIDTH characters, so a
+# new value never changes the position of anything else.
+NUMBER_WIDTH = 24
+LINE_WIDTH = 2 + 2*(NUMBER_WIDTH+1)
+
+# NL bound types: 0 range, 1 upper, 2 lower, 3 free, 4 equal
+def _bound_line(lower, upper):
+    if lower is None:
+        lower = -math.inf
+    if upper is None:
+        upper = math.inf
+    if lower == upper:
+        kind, numbers = 4, (lower,)
+    elif lower > -math.inf and upper < math.inf:
+        kind, numbers = 0, (lower, upper)
+    elif upper < math.inf:
+        kind, numbers = 1, (upper,)
+    elif lower > -math.inf:
+        kind, numbers = 2, (lower,)
+    else:
+        kind, numbers = 3, ()
+    line = " ".join(["%d" % kind] + ["%-*r" % (NUMBER_WIDTH, float(v))
+                                     for v in numbers])
+    return kind, (line.ljust(LINE_WIDTH) + "\n").encode("ascii")
+
+def _read_bounds(line):
+    numbers = [float(v) for v in line.split(b"#")[0].split()]
+    kind = int(numbers[0])
+    lower, upper = {0: (numbers[1:3]),
+                    1: (-math.inf, numbers[-1]),
+                    2: (numbers[-1], math.inf),
+                    3: (-math.inf, math.inf),
+                    4: (numbers[-1], numbers[-1])}[kind]
+    return kind, lower, upper
+
+def make_nl_template(nl_filename, symbol_map):
+    """
+    Rewrites an NL file written by Pyomo in text format as a
+    template: the constraint bounds (r segment), the variable
+    bounds (b segment) and the objective coefficients (G
+    segment) are padded to a fixed width, and their byte
+    offsets are saved in the sidecar file nl_filename+".index.npz".
+    symbol_map is the symbol map of the NL file; it is used to
+    record the constant that the NL writer moved from each
+    constraint body into its bounds.
+    """
+    constraints = dict((int(symbol[1:]), obj)
+                       for symbol, obj in symbol_map.bySymbol.items()
+                       if symbol[0] == "c")
+
+    with open(nl_filename, "rb") as f:
+        lines = f.readlines()
+    if not lines[0].startswith(b"g"):
+        raise ValueError("NL templates need a text format NL file")
+    counts = lines[1].split(b"#")[0].split()
+    nvars, ncons = int(counts[0]), int(counts[1])
+    index = {"row_offsets": numpy.zeros(ncons, dtype=numpy.int64),
+             "row_types": numpy.zeros(ncons, dtype=numpy.int8),
+             "row_constants": numpy.zeros(ncons),
+             "var_offsets": numpy.zeros(nvars, dtype=numpy.int64),
+             "obj_offsets": numpy.full(nvars, -1, dtype=numpy.int64)}
+
+    tmp_filename = nl_filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            f.write(line)
+            i += 1
+            token = line.split(None, 1)[0] if line.strip() else b""
+            if token in (b"r", b"b"):
+                for j in range(ncons if token == b"r" else nvars):
+                    kind, lower, upper = _read_bounds(lines[i+j])
+                    if token == b"r":
+                        index["row_offsets"][j] = f.tell()
+                        index["row_types"][j] = kind
+                        # the NL bounds are the Pyomo bounds minus
+                        # the constant in the constraint body
+                        con = constraints[j]
+                        if isinstance(con, weakref.ref):
+                            con = con()
+                        if kind in (0, 2, 4):
+                            index["row_constants"][j] = \
+                                value(con.lower) - lower
+                        elif kind == 1:
+                            index["row_constants"][j] = \
+                                value(con.upper) - upper
+                    else:
+                        index["var_offsets"][j] = f.tell()
+                    f.write(_bound_line(lower, upper)[1])
+                i += ncons if token == b"r" else nvars
+            elif token.startswith(b"G"):
+                for j in range(int(line.split()[1])):
+                    col, coef = lines[i+j].split()[:2]
+                    f.write(col + b" ")
+                    index["obj_offsets"][int(col)] = f.tell()
+                    f.write(b"%-*s\n" % (NUMBER_WIDTH,
+                                         repr(float(coef)).encode("ascii")))
+                i += int(line.split()[1])
+    os.replace(tmp_filename, nl_filename)
+    numpy.savez(nl_filename + ".index.npz", **index)
+
+def _items(changes):
+    # changes may be a mapping, such as a ComponentMap, or pairs
+    if changes is None:
+        return []
+    if hasattr(changes, "items"):
+        return changes.items()
+    return changes
+
+def _stat(filename):
+    # the size and modification time of a file, to tell whether it
+    # was changed since a variant was written to it
+    st = os.stat(filename)
+    return st.st_size, st.st_mtime_ns
+
+class NLTemplate(object):
+    """
+    Writes variants of an NL template with new objective
+    coefficients, variable bounds or constraint bounds. A
+    variant is a copy of the template in which only the
+    changed numbers are overwritten; the structure, and
+    therefore the symbol map written with the template, are
+    unchanged. The first variant written to a file copies the
+    whole template. A later variant written to the same file
+    (e.g. one file per worker) only restores the numbers that
+    the previous variant changed and writes the new ones, so
+    it costs about the size of the changes.
+    """
+
+    def __init__(self, nl_filename, symbol_map_filename):
+        self.nl_filename = nl_filename
+        self.symbol_map_filename = symbol_map_filename
+        with numpy.load(nl_filename + ".index.npz") as index:
+            self.index = dict(index)
+        self._model = None
+        # the offsets and lengths patched in each variant file, and
+        # the size and modification time the file had afterwards
+        self._patched = {}
+
+    def _numbers(self, model, symbol_type):
+        # map components of model to their NL numbers, once per model
+        if self._model is not model:
+            self._model = model
+            self._maps = {}
+        if symbol_type not in self._maps:
+            numbers, components = components_in_order(
+                model, self.symbol_map_filename, symbol_type)
+            self._maps[symbol_type] = ComponentMap(
+                zip(components, numbers.tolist()))
+        return self._maps[symbol_type]
+
+    def _number(self, model, component, symbol_type):
+        # components can be given as NL symbols such as 'v3'
+        if isinstance(component, str):
+            if component[0] != symbol_type:
+                raise ValueError("'%s' is not a '%s' symbol"
+                                 % (component, symbol_type))
+            return int(component[1:])
+        if model is None:
+            raise ValueError("A model is needed to look up component %s"
+                             % (component.name))
+        return self._numbers(model, symbol_type)[component]
+
+    def write_variant(self, nl_filename, model=None, objective=None,
+                      variable_bounds=None, constraint_bounds=None):
+        """
+        Writes a copy of the template to nl_filename with the
+        given changes: objective maps variables to their new
+        objective coefficient, variable_bounds maps variables to
+        (lower, upper) pairs, and constraint_bounds maps
+        constraints to (lower, upper) pairs, as they would be
+        given to the Pyomo constraint. None means no bound.
+        Each of these may be a ComponentMap or a list of
+        (component, value) pairs. Components may be given as NL
+        symbols ('v3', 'c0'), or as components of model, which
+        must have the same structure as the model the template
+        was written from. Pyomo components cannot be dictionary
+        keys, so a plain dictionary only works with NL symbols,
+        e.g. {'v3': 2.0}.
+        Objective coefficients that are zero in the template,
+        and constraint bounds that change the kind of constraint
+        (e.g. from inequality to equality), change the structure
+        and need a new NL file. If nl_filename holds the last
+        variant written to it by this template, and has not been
+        changed since, it is patched in place instead of being
+        copied again. Returns nl_filename.
+        """
+        changes = []
+        for var, coef in _items(objective):
+            col = self._number(model, var, "v")
+            offset = self.index["obj_offsets"][col]
+            if offset < 0:
+                raise ValueError("Variable %s is not in the objective of "
+                                 "the template" % (var))
+            changes.append((offset, b"%-*s" % (
+                NUMBER_WIDTH, repr(float(coef)).encode("ascii"))))
+        for var, (lower, upper) in _items(variable_bounds):
+            col = self._number(model, var, "v")
+            changes.append((self.index["var_offsets"][col],
+                            _bound_line(lower, upper)[1]))
+        for con, (lower, upper) in _items(constraint_bounds):
+            row = self._number(model, con, "c")
+            constant = self.index["row_constants"][row]
+            kind, line = _bound_line(
+                None if lower is None else lower - constant,
+                None if upper is None else upper - constant)
+            if kind != self.index["row_types"][row]:
+                raise ValueError("New bounds change the kind of constraint "
+                                 "%s; write a new NL file" % (con))
+            changes.append((self.index["row_offsets"][row], line))
+
+        path = os.path.abspath(nl_filename)
+        restore = []
+        if path != os.path.abspath(self.nl_filename):
+            patched, stat = self._patched.pop(path, ({}, None))
+            if stat is not None and os.path.exists(path) and \
+               _stat(path) == stat:
+                # undo the previous variant, then apply this one
+                with open(self.nl_filename, "rb") as f:
+                    for offset, length in patched.items():
+                        f.seek(offset)
+                        restore.append((offset, f.read(length)))
+            else:
+                shutil.copyfile(self.nl_filename, nl_filename)
+        # a change overrides the restored template value at its offset
+        writes = dict(restore)
+        writes.update(changes)
+        with open(nl_filename, "r+b") as f:
+            for offset, data in sorted(writes.items()):
+                f.seek(offset)
+                f.write(data)
+        if path != os.path.abspath(self.nl_filename):
+            self._patched[path] = (
+                dict((offset, len(data)) for offset, data in changes),
+                _stat(path))
+        return nl_filename
@@ -0,0 +1,154 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import os
+import time
+import asyncio
+import concurrent.futures
+from write import write_nl
+from read import load_sol
+
+class SolveJob(object):
+    """
+    One model to be solved by run_jobs. After the run, results
+    holds the results object returned by load_sol (or None if
+    the job failed), error describes why it failed, output
+    holds the solver output, and times holds the seconds spent
+    writing, waiting for a solver slot, solving and loading (for
+    the steps that ran), and the total latency.
+    """
+
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+        self.nl_filename = None
+        self.symbol_map_filename = None
+        self.results = None
+        self.returncode = None
+        self.output = None
+        self.error = None
+        self.times = {}
+
+async def _run_job(job, solver, directory, loop, executor, slots, pending,
+                   write_options):
+    async with pending:
+        start = time.time()
+        job.nl_filename = os.path.join(directory, job.name+".nl")
+        stub = job.nl_filename[:-3]
+        # an error in one job is recorded on it, so that it does not
+        # stop the other jobs
+        try:
+            # the NL writer and the SOL loader run in one worker
+            # thread, so the event loop stays free to handle finished
+            # solvers
+            job.symbol_map_filename = await loop.run_in_executor(
+                executor, lambda: write_nl(job.model, job.nl_filename,
+                                           **write_options))
+            written = time.time()
+            job.times["write"] = written - start
+            # a SOL file left by an earlier run must not be loaded if
+            # the solver fails to write one
+            if os.path.exists(stub+".sol"):
+                os.remove(stub+".sol")
+
+            async with slots:
+                started = time.time()
+                job.times["wait"] = started - written
+                process = await asyncio.create_subprocess_exec(
+                    *(solver + [stub, "-AMPL"]),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT)
+                output, _ = await process.communicate()
+            solved = time.time()
+            job.times["solve"] = solved - started
+            job.returncode = process.returncode
+            job.output = output.decode(errors="replace")
+
+            if process.returncode != 0:
+                job.error = "Solver failed with return code %d" \
+                    % (process.returncode)
+            elif not os.path.exists(stub+".sol"):
+                job.error = "Solver did not write a SOL file"
+            else:
+                job.results = await loop.run_in_executor(
+                    executor, load_sol, job.model, stub+".sol",
+                    job.symbol_map_filename)
+            job.times["load"] = time.time() - solved
+        except Exception as e:
+            job.error = "%s: %s" % (type(e).__name__, e)
+        job.times["total"] = time.time() - start
+    return job
+
+async def solve_jobs(jobs, solver, directory, max_concurrent=None,
+                     **write_options):
+    """
+    Writes, solves and loads the given SolveJobs, overlapping
+    the work of different jobs: NL files are written and SOL
+    files loaded in this process while solver subprocesses run.
+    solver is the command that runs the solver, as a list; it is
+    called with the NL file stub and -AMPL, like any ASL solver.
+    At most max_concurrent solvers run at once, by default one
+    for every core except the one used by this process, and at
+    most twice that many jobs are written but not yet loaded, so
+    NL files are not written far ahead of the solvers. The
+    other keywords are passed on to write_nl.
+    """
+    if max_concurrent is None:
+        max_concurrent = max(1, (os.cpu_count() or 1) - 1)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    write_options.setdefault("symbol_map_format", "columnar")
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_concurrent)
+    pending = asyncio.Semaphore(2*max_concurrent)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return await asyncio.gather(*(
+            _run_job(job, solver, directory, loop, executor, slots,
+                     pending, write_options)
+            for job in jobs))
+
+def run_jobs(jobs, solver, directory, max_concurrent=None,
+             **write_options):
+    """
+    Runs solve_jobs in a new event loop and returns the jobs.
+    """
+    return asyncio.run(solve_jobs(jobs, solver, directory,
+                                  max_concurrent=max_concurrent,
+                                  **write_options))
+
+if __name__ == "__main__":
+    import sys
+    from script import create_model
+
+    # Usage: python pipeline.py [jobs] [solver command ...]
+    njobs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    solver = sys.argv[2:] or [sys.executable, "lp_solver.py"]
+    jobs = [SolveJob(create_model(lower=1.0+i), "job_%d" % i)
+            for i in range(njobs)]
+    start = time.time()
+    run_jobs(jobs, solver, "jobs")
+    elapsed = time.time() - start
+
+    print("%8s %10s %8s %8s %8s %8s %8s %10s" % (
+        "Job", "Objective", "Write", "Wait", "Solve", "Load", "Total",
+        "Status"))
+    for job in jobs:
+        print("%8s %10s %8.3f %8.3f %8.3f %8.3f %8.3f %10s" % (
+            job.name,
+            "%.2f" % job.model.o() if job.results else "-",
+            job.times.get("write", 0.0), job.times.get("wait", 0.0),
+            job.times.get("solve", 0.0), job.times.get("load", 0.0),
+            job.times["total"],
+            job.results.solver.termination_condition if job.results
+            else job.error))
+    print("Solved %d jobs in %.2f seconds (%.1f per second)"
+          % (len(jobs), elapsed, len(jobs) / elapsed))
@@ -10,12 +10,57 @@
 #  ___________________________________________________________________________
 
 
+import os
+import re
+import itertools
+import numpy
 import pyomo.environ
 from pyomo.core import SymbolMap
+from pyomo.core.base.suffix import active_import_suffix_generator
+from pyomo.core.staleflag import StaleFlagManager
 from pyomo.opt import (ReaderFactory,
-                       ResultsFormat)
+                       ResultsFormat,
+                       SolverResults,
+                       SolverStatus,
+                       TerminationCondition)
 # use fast version of pickle (python 2 or 3)
 from six.moves import cPickle as pickle
+from symbol_map import ColumnarSymbolMap, is_columnar
+
+# solve_result_num ranges in an SOL file and what they mean, as
+# interpreted by Pyomo's SOL reader
+SOLVE_RESULT = ((100, TerminationCondition.optimal, SolverStatus.ok),
+                (200, TerminationCondition.optimal, SolverStatus.warning),
+                (300, TerminationCondition.infeasible, SolverStatus.warning),
+                (400, TerminationCondition.unbounded, SolverStatus.warning),
+                (500, TerminationCondition.maxIterations,
+                 SolverStatus.warning),
+                (600, TerminationCondition.internalSolverError,
+                 SolverStatus.error))
+
+# symbol maps already loaded by this process, by file name
+_symbol_maps = {}
+
+def load_symbol_map(symbol_map_filename):
+    """
+    Returns the contents of a symbol map file: a
+    ColumnarSymbolMap, or the tuple of (symbol, ComponentUID)
+    pairs for a pickle. Each file is only loaded once per
+    process, since write_nl may share one symbol map between
+    many NL files; it is loaded again if the file changes.
+    """
+    filename = os.path.realpath(symbol_map_filename)
+    stat = os.stat(filename)
+    key = (stat.st_mtime_ns, stat.st_size)
+    if filename in _symbol_maps and _symbol_maps[filename][0] == key:
+        return _symbol_maps[filename][1]
+    if is_columnar(filename):
+        symbol_map = ColumnarSymbolMap(filename)
+    else:
+        with open(filename, "rb") as f:
+            symbol_map = pickle.load(f)
+    _symbol_maps[filename] = (key, symbol_map)
+    return symbol_map
 
 def read_sol(model, sol_filename, symbol_map_filename, suffixes=[".*"]):
     """
@@ -25,7 +70,9 @@ def read_sol(model, sol_filename, symbol_map_filename, suffixes=[".*"]):
     suffixes found in the NL file will be extracted. This
     can be overridden using the suffixes keyword, which
     should be a list of suffix names or regular expressions
-    (or None).
+    (or None). The symbol map file may be a pickle or a
+    columnar symbol map written by write_nl; for the latter
+    only the symbols that appear in the SOL file are resolved.
     """
     if suffixes is None:
         suffixes = []
@@ -35,8 +82,17 @@ def read_sol(model, sol_filename, symbol_map_filename, suffixes=[".*"]):
         results = reader(sol_filename, suffixes=suffixes)
 
     # regenerate the symbol_map for this model
-    with open(symbol_map_filename, "rb") as f:
-        symbol_cuid_pairs = pickle.load(f)
+    symbol_cuid_pairs = load_symbol_map(symbol_map_filename)
+    if isinstance(symbol_cuid_pairs, ColumnarSymbolMap):
+        symbols = []
+        for solution in results.solution:
+            symbols.extend(solution.variable)
+            symbols.extend(solution.constraint)
+            symbols.extend(solution.objective)
+        results._smap = symbol_cuid_pairs.create_symbol_map(
+            model, set(symbols))
+        return results
+
     symbol_map = SymbolMap()
     symbol_map.addSymbols((cuid.find_component(model), symbol)
                           for symbol, cuid in symbol_cuid_pairs)
@@ -46,6 +102,231 @@ def read_sol(model, sol_filename, symbol_map_filename, suffixes=[".*"]):
 
     return results
 
+def stream_sol(sol_filename, suffixes=[".*"], callback=None,
+               primal=None, dual=None, suffix_arrays=None,
+               chunksize=100000):
+    """
+    Reads an SOL file in chunks of at most chunksize values, so
+    that memory use does not depend on the size of the solution.
+    Each chunk is handed to callback(kind, name, index, values),
+    where kind is 'primal', 'dual', or the kind of suffix
+    ('var', 'con', 'obj' or 'prob'), name is the suffix name
+    (None for primal and dual values), index holds the NL
+    indices and values the values, both as NumPy arrays. The
+    values may instead (or also) be stored in preallocated
+    arrays: primal and dual, and suffix_arrays, a dictionary
+    with an array for each (kind, name) pair of a suffix, e.g.
+    ('var', 'sstatus'), since variables and constraints often
+    have suffixes with the same name. Duals and suffixes that
+    do not match one of the names or regular expressions in
+    suffixes are skipped without being parsed.
+
+    Returns a dictionary with the solver message, the
+    solve_result_num and the number of variables and
+    constraints.
+    """
+    if suffixes is None:
+        suffixes = []
+    if suffix_arrays is None:
+        suffix_arrays = {}
+    def wanted(name):
+        return any(re.match(suf, name) for suf in suffixes)
+    def skip(f, count):
+        for line in itertools.islice(f, count):
+            pass
+
+    with open(sol_filename, "r") as f:
+        message = []
+        for line in f:
+            if line.strip() == "Options":
+                break
+            if line.strip():
+                message.append(line.strip())
+        else:
+            raise ValueError("Error reading '%s': no Options line found"
+                             % (sol_filename))
+
+        # the options, followed by the number of constraints and
+        # duals, and the number of variables and primal values
+        nopts = int(f.readline())
+        need_vbtol = nopts > 4
+        if need_vbtol:
+            nopts -= 2
+        z = [int(f.readline()) for i in range(nopts+4)]
+        if need_vbtol:
+            f.readline()
+        info = {"message": "; ".join(message),
+                "ncons": z[nopts],
+                "nvars": z[nopts+2]}
+
+        for kind, count, array in (("dual", z[nopts+1], dual),
+                                   ("primal", z[nopts+3], primal)):
+            if kind == "dual" and not wanted("dual"):
+                skip(f, count)
+                continue
+            for first in range(0, count, chunksize):
+                n = min(chunksize, count - first)
+                values = numpy.fromiter(
+                    map(float, itertools.islice(f, n)),
+                    dtype=float, count=n)
+                if array is not None:
+                    array[first:first+n] = values
+                if callback is not None:
+                    callback(kind, None,
+                             numpy.arange(first, first+n), values)
+
+        line = f.readline()
+        info["solve_result_num"] = int(line.split()[2]) if line else 0
+        kinds = ("var", "con", "obj", "prob")
+        for line in f:
+            line = line.split()
+            if not line:
+                continue
+            if line[0] != "suffix":
+                break
+            kind = int(line[1])
+            suffix_kind = kinds[kind & 3]
+            nvalues = int(line[2])
+            name = f.readline().strip()
+            skip(f, int(line[5]))
+            if not wanted(name):
+                skip(f, nvalues)
+                continue
+            for first in range(0, nvalues, chunksize):
+                n = min(chunksize, nvalues - first)
+                data = numpy.fromiter(
+                    map(float, "".join(itertools.islice(f, n)).split()),
+                    dtype=float, count=2*n).reshape(n, 2)
+                index = data[:, 0].astype(numpy.int64)
+                values = data[:, 1]
+                if not kind & 4:
+                    values = values.astype(numpy.int64)
+                if (suffix_kind, name) in suffix_arrays:
+                    suffix_arrays[suffix_kind, name][index] = values
+                if callback is not None:
+                    callback(suffix_kind, name, index, values)
+    return info
+
+def read_sol_arrays(sol_filename, suffixes=[".*"]):
+    """
+    Reads an SOL file into NumPy arrays, without creating a
+    results object. Returns a dictionary with the solver
+    message, the solve_result_num, the primal and dual
+    vectors in NL order and the suffixes that match one of
+    the given names or regular expressions. The suffixes are
+    stored by kind ('var', 'con', 'obj' or 'prob') and name,
+    as a pair of arrays with NL indices and values.
+    """
+    chunks = {}
+    def collect(kind, name, index, values):
+        chunks.setdefault((kind, name), []).append((index, values))
+
+    sol = stream_sol(sol_filename, suffixes=suffixes, callback=collect)
+    sol["suffixes"] = {"var": {}, "con": {}, "obj": {}, "prob": {}}
+    for (kind, name), data in chunks.items():
+        values = numpy.concatenate([values for index, values in data])
+        if name is None:
+            sol[kind] = values
+        else:
+            sol["suffixes"][kind][name] = (
+                numpy.concatenate([index for index, values in data]),
+                values)
+    sol.setdefault("primal", numpy.empty(0))
+    sol.setdefault("dual", numpy.empty(0))
+    return sol
+
+def components_in_order(model, symbol_map_filename, symbol_type):
+    """
+    Returns the NL numbers of all symbols of the given type
+    ('v', 'c' or 'o') in a symbol map file, in increasing
+    order, and a list with the components on model that they
+    refer to.
+    """
+    symbol_map = load_symbol_map(symbol_map_filename)
+    if isinstance(symbol_map, ColumnarSymbolMap):
+        return symbol_map.components_in_order(model, symbol_type)
+    symbol_cuid_pairs = sorted((int(symbol[1:]), cuid)
+                               for symbol, cuid in symbol_map
+                               if symbol[0] == symbol_type)
+    return (numpy.array([number for number, cuid in symbol_cuid_pairs],
+                        dtype=numpy.int64),
+            [cuid.find_component_on(model)
+             for number, cuid in symbol_cuid_pairs])
+
+def load_sol(model, sol_filename, symbol_map_filename, suffixes=[".*"]):
+    """
+    Loads the solution in the SOL file directly into the given
+    Pyomo model. This is a faster alternative to read_sol
+    followed by model.solutions.load_from for large models:
+    the primal and dual vectors are read into NumPy arrays
+    and matched to variables and constraints by their NL
+    order, without building a results dictionary for them.
+    Suffix values are loaded into the active import suffixes
+    declared on the model, as load_from does. Returns a
+    results object holding only the solver status.
+    """
+    sol = read_sol_arrays(sol_filename, suffixes=suffixes)
+
+    results = SolverResults()
+    results.solver.message = sol["message"]
+    results.solver.id = sol["solve_result_num"]
+    for limit, condition, status in SOLVE_RESULT:
+        if 0 <= sol["solve_result_num"] < limit:
+            results.solver.termination_condition = condition
+            results.solver.status = status
+            break
+    if results.solver.termination_condition in (
+            TerminationCondition.unbounded,
+            TerminationCondition.internalSolverError):
+        return results
+
+    components = {}
+    def in_order(symbol_type):
+        if symbol_type not in components:
+            components[symbol_type] = components_in_order(
+                model, symbol_map_filename, symbol_type)
+        return components[symbol_type]
+
+    StaleFlagManager.mark_all_as_stale()
+
+    # load the primal values, which a solver that found no
+    # solution may leave out
+    if len(sol["primal"]):
+        numbers, variables = in_order("v")
+        for var, value in zip(variables, sol["primal"][numbers].tolist()):
+            var.set_value(value, skip_validation=True)
+
+    # load the duals and other suffixes
+    import_suffixes = dict(active_import_suffix_generator(model))
+    for suffix in import_suffixes.values():
+        suffix.clear_all_values()
+    if "dual" in import_suffixes and len(sol["dual"]):
+        numbers, constraints = in_order("c")
+        import_suffixes["dual"].update_values(
+            zip(constraints, sol["dual"][numbers].tolist()), expand=False)
+    for kind, symbol_type in (("var", "v"), ("con", "c"), ("obj", "o")):
+        for name, (index, values) in sol["suffixes"][kind].items():
+            if name not in import_suffixes:
+                continue
+            numbers, comps = in_order(symbol_type)
+            positions = numpy.searchsorted(numbers, index)
+            known = positions < len(numbers)
+            known[known] = numbers[positions[known]] == index[known]
+            if not known.all():
+                raise ValueError("Suffix '%s' in '%s' has a value for %s%d, "
+                                 "which is not in the symbol map"
+                                 % (name, sol_filename, symbol_type,
+                                    index[~known][0]))
+            import_suffixes[name].update_values(
+                zip([comps[i] for i in positions.tolist()],
+                    values.tolist()), expand=False)
+    for name, (index, values) in sol["suffixes"]["prob"].items():
+        if name in import_suffixes:
+            import_suffixes[name][model] = values.tolist()[0]
+
+    StaleFlagManager.mark_all_as_stale(delayed=True)
+    return results
+
 if __name__ == "__main__":
     from pyomo.opt import TerminationCondition
     from script import create_model
@@ -13,11 +13,11 @@
 from pyomo.environ import *
 from pyomo.opt import SolverFactory, TerminationCondition
 
-def create_model():
+def create_model(lower=1):
     model = ConcreteModel()
     model.x = Var()
     model.o = Objective(expr=model.x)
-    model.c = Constraint(expr=model.x >= 1)
+    model.c = Constraint(expr=model.x >= lower)
     model.x.set_value(1.0)
     return model
 
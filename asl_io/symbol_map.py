@@ -0,0 +1,320 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import ast
+import hashlib
+import json
+import struct
+import weakref
+import numpy
+from pyomo.core import SymbolMap
+
+# The columnar symbol map file starts with this magic string,
+# followed by the length of a JSON header and the header itself.
+# The header gives the dtype, shape and byte offset of each array,
+# and the arrays follow, each aligned to ALIGNMENT bytes so that
+# they can be memory mapped in place.
+MAGIC = b"PYOMOSYM"
+ALIGNMENT = 64
+
+def is_columnar(filename):
+    """
+    Returns True if filename holds a columnar symbol map.
+    """
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def _string_table(strings):
+    # store a list of strings as one utf-8 byte array plus the
+    # offset of each string in it
+    data = [s.encode("utf-8") for s in strings]
+    offsets = numpy.zeros(len(data)+1, dtype=numpy.int64)
+    numpy.cumsum([len(s) for s in data], out=offsets[1:])
+    return numpy.frombuffer(b"".join(data), dtype=numpy.uint8), offsets
+
+def _int_array(values, count):
+    # use 32-bit integers unless the values need more
+    array = numpy.fromiter(values, dtype=numpy.int64, count=count)
+    if len(array) == 0 or array.max() < 2**31:
+        array = array.astype(numpy.int32)
+    return array
+
+def _native(key):
+    # NumPy scalars, e.g. from Set(initialize=numpy.arange(3)), are
+    # stored as the Python values they are equal to
+    if isinstance(key, numpy.generic):
+        return key.item()
+    if type(key) is tuple:
+        return tuple(_native(k) for k in key)
+    return key
+
+def _encode_key(key):
+    # keys are stored as their repr, and read back with literal_eval
+    text = repr(key)
+    if type(key) not in (int, str, bool):
+        try:
+            same = ast.literal_eval(text) == key
+        except (ValueError, SyntaxError):
+            same = False
+        if not same:
+            raise ValueError("Index key %s cannot be stored in a columnar "
+                             "symbol map; use symbol_map_format='pickle'"
+                             % (text))
+    return text
+
+def symbol_map_arrays(symbol_map):
+    """
+    Returns the arrays of the columnar form of a Pyomo symbol
+    map. Component names and the keys of their indices are
+    stored once in string tables, and each symbol is stored as
+    integers: its NL index, the component it belongs to and
+    the positions of its index keys.
+    """
+    names, name_ids = [], {}
+    keys, key_ids = [], {}
+    symbols = []
+    for symbol, obj in symbol_map.bySymbol.items():
+        # older versions of Pyomo store weak references
+        if isinstance(obj, weakref.ref):
+            obj = obj()
+        component = obj.parent_component()
+        cid = name_ids.get(id(component))
+        if cid is None:
+            cid = name_ids[id(component)] = len(names)
+            names.append(component.getname(fully_qualified=True))
+        if component.is_indexed():
+            index = obj.index()
+            if type(index) is not tuple:
+                index = (index,)
+            index_keys = []
+            for key in index:
+                key = _native(key)
+                # 1, 1.0 and True are equal, but are different keys
+                kid = key_ids.get((type(key), key))
+                if kid is None:
+                    kid = key_ids[type(key), key] = len(keys)
+                    keys.append(_encode_key(key))
+                index_keys.append(kid)
+        else:
+            index_keys = []
+        symbols.append((symbol[0], int(symbol[1:]), cid, index_keys))
+
+    # sort by symbol type and NL index, so a symbol can be found
+    # with a binary search
+    symbols.sort(key=lambda s: s[:2])
+    types = sorted(set(s[0] for s in symbols))
+    type_start = numpy.searchsorted([s[0] for s in symbols],
+                                    types + [chr(0x10ffff)])
+
+    arrays = {}
+    arrays["names"], arrays["name_offsets"] = _string_table(names)
+    arrays["keys"], arrays["key_offsets"] = _string_table(keys)
+    arrays["types"] = numpy.frombuffer("".join(types).encode("ascii"),
+                                       dtype=numpy.uint8)
+    arrays["type_start"] = numpy.asarray(type_start, dtype=numpy.int64)
+    arrays["number"] = _int_array((s[1] for s in symbols), len(symbols))
+    arrays["component"] = _int_array((s[2] for s in symbols), len(symbols))
+    index_offsets = numpy.zeros(len(symbols)+1, dtype=numpy.int64)
+    numpy.cumsum([len(s[3]) for s in symbols], out=index_offsets[1:])
+    arrays["index_offsets"] = _int_array(index_offsets, len(index_offsets))
+    arrays["index_keys"] = _int_array((kid for s in symbols
+                                       for kid in s[3]),
+                                      int(index_offsets[-1]))
+    return arrays
+
+def structure_fingerprint(arrays):
+    """
+    Returns a hash of the arrays from symbol_map_arrays. It only
+    depends on the component names, the indices and the NL
+    order of the symbols, so models with the same structure
+    but different data have the same fingerprint.
+    """
+    digest = hashlib.sha1()
+    for name, array in sorted(arrays.items()):
+        digest.update(("%s %s %s;" % (name, array.dtype.str,
+                                      array.shape)).encode("ascii"))
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def write_columnar_symbol_map(symbol_map, filename):
+    """
+    Writes the symbols in a Pyomo symbol map to filename as a
+    columnar symbol map. The symbol map may also be given as
+    the arrays returned by symbol_map_arrays.
+    """
+    if isinstance(symbol_map, dict):
+        arrays = symbol_map
+    else:
+        arrays = symbol_map_arrays(symbol_map)
+
+    # lay the arrays out after the header
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = (array.dtype.str, array.shape, offset)
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps(layout).encode("ascii")
+    start = -(-(len(MAGIC)+8+len(header)) // ALIGNMENT) * ALIGNMENT
+    with open(filename, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<q", len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(start + layout[name][2])
+            f.write(array.tobytes())
+
+class ColumnarSymbolMap(object):
+    """
+    A read-only view of a columnar symbol map file. The arrays
+    are memory mapped, and names, keys and components are only
+    decoded when a symbol that needs them is looked up.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("'%s' is not a columnar symbol map"
+                                 % (filename))
+            size, = struct.unpack("<q", f.read(8))
+            header = json.loads(f.read(size).decode("ascii"))
+        start = -(-(len(MAGIC)+8+size) // ALIGNMENT) * ALIGNMENT
+        self._arrays = {}
+        for name, (dtype, shape, offset) in header.items():
+            if numpy.prod(shape) == 0:
+                self._arrays[name] = numpy.zeros(shape, dtype=dtype)
+            else:
+                self._arrays[name] = numpy.memmap(
+                    filename, dtype=dtype, mode="r",
+                    offset=start+offset, shape=tuple(shape))
+        types = bytes(self._arrays["types"]).decode("ascii")
+        type_start = self._arrays["type_start"]
+        self._type_range = dict((t, (int(type_start[i]),
+                                     int(type_start[i+1])))
+                                for i, t in enumerate(types))
+        self._names = {}
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._arrays["number"])
+
+    def _decode(self, table, cache, ids):
+        # decode the strings with the given ids that are not cached yet
+        offsets = self._arrays[table[:-1]+"_offsets"]
+        for i in ids:
+            if i not in cache:
+                value = bytes(self._arrays[table][offsets[i]:offsets[i+1]]
+                              ).decode("utf-8")
+                if table == "keys":
+                    value = ast.literal_eval(value)
+                cache[i] = value
+
+    def _rows(self, symbols):
+        # find the row of each symbol with one binary search per type
+        symbols = list(symbols)
+        types = numpy.array([s[0] for s in symbols])
+        numbers = numpy.array([int(s[1:]) for s in symbols],
+                              dtype=numpy.int64)
+        rows = numpy.empty(len(symbols), dtype=numpy.int64)
+        for t in numpy.unique(types):
+            first, last = self._type_range.get(str(t), (0, 0))
+            mask = types == t
+            number = self._arrays["number"][first:last]
+            pos = numpy.searchsorted(number, numbers[mask])
+            found = pos < len(number)
+            found[found] = number[pos[found]] == numbers[mask][found]
+            if not found.all():
+                raise KeyError(symbols[numpy.flatnonzero(mask)[
+                    numpy.flatnonzero(~found)[0]]])
+            rows[mask] = first + pos
+        return symbols, rows
+
+    def symbols(self):
+        """
+        Returns an iterator over all symbols in the map.
+        """
+        for t, (first, last) in self._type_range.items():
+            for number in self._arrays["number"][first:last]:
+                yield t + str(number)
+
+    def find_components(self, model, symbols):
+        """
+        Returns a list with the component on model that each of
+        the given symbols refers to.
+        """
+        symbols, rows = self._rows(symbols)
+        return self._components(model, rows)
+
+    def components_in_order(self, model, symbol_type):
+        """
+        Returns the NL numbers of all symbols of the given type
+        ('v', 'c' or 'o') in increasing order, and a list with
+        the components on model that they refer to.
+        """
+        first, last = self._type_range.get(symbol_type, (0, 0))
+        numbers = numpy.array(self._arrays["number"][first:last])
+        return numbers, self._components(model,
+                                         numpy.arange(first, last))
+
+    def _components(self, model, rows):
+        cids = self._arrays["component"][rows]
+        offsets = self._arrays["index_offsets"]
+        start = offsets[rows]
+        length = offsets[rows+1] - start
+
+        # gather the index keys of the requested rows only
+        ends = numpy.cumsum(length)
+        positions = (numpy.arange(ends[-1] if len(ends) else 0)
+                     - numpy.repeat(ends - length - start, length))
+        index_keys = self._arrays["index_keys"][positions]
+
+        components = {}
+        for cid in numpy.unique(cids).tolist():
+            self._decode("names", self._names, [cid])
+            name = self._names[cid]
+            components[cid] = model.find_component(name)
+            if components[cid] is None:
+                raise KeyError("Component '%s' not found on model %s"
+                               % (name, model.name))
+        self._decode("keys", self._keys, numpy.unique(index_keys).tolist())
+
+        keys = self._keys
+        index_keys = index_keys.tolist()
+        result = []
+        pos = 0
+        for cid, n in zip(cids.tolist(), length.tolist()):
+            component = components[cid]
+            if n == 0:
+                result.append(component)
+            elif n == 1:
+                result.append(component[keys[index_keys[pos]]])
+            else:
+                result.append(component[tuple(keys[k] for k in
+                                              index_keys[pos:pos+n])])
+            pos += n
+        return result
+
+    def find_component(self, model, symbol):
+        """
+        Returns the component on model that symbol refers to.
+        """
+        return self.find_components(model, [symbol])[0]
+
+    def create_symbol_map(self, model, symbols):
+        """
+        Returns a Pyomo SymbolMap for model that holds only the
+        given symbols.
+        """
+        symbols = list(symbols)
+        symbol_map = SymbolMap()
+        symbol_map.addSymbols(zip(self.find_components(model, symbols),
+                                  symbols))
+        return symbol_map
@@ -10,37 +10,93 @@
 #  ___________________________________________________________________________
 
 
+import os
+import weakref
 import pyomo.environ
 from pyomo.core import ComponentUID
 from pyomo.opt import ProblemFormat
 # use fast version of pickle (python 2 or 3)
 from six.moves import cPickle as pickle
+from nl_template import make_nl_template
+from symbol_map import (symbol_map_arrays,
+                        structure_fingerprint,
+                        write_columnar_symbol_map)
 
-def write_nl(model, nl_filename, **kwds):
+def write_nl(model, nl_filename, symbol_map_format="pickle",
+             symbol_map_cache=None, template=False, **kwds):
     """
     Writes a Pyomo model in NL file format and stores
     information about the symbol map that allows it to be
     recovered at a later time for a Pyomo model with
-    matching component names.
+    matching component names. The symbol map is pickled by
+    default. With symbol_map_format="columnar" it is stored
+    in the compact format from symbol_map.py instead, which
+    is much smaller and faster to read for large models.
+
+    If symbol_map_cache is the name of a directory, the symbol
+    map is stored there under a fingerprint of the model
+    structure (component names, indices and the NL order of
+    variables, constraints and objectives). Models that only
+    differ in their data share one symbol map file, which is
+    written the first time it is needed. The name of the
+    symbol map file is returned in either case.
+
+    With template=True the NL file is written as a template
+    (see nl_template.py): variants with new objective
+    coefficients, variable bounds or constraint bounds can
+    then be written with NLTemplate(nl_filename,
+    symbol_map_filename).write_variant, and they share the
+    symbol map of the template.
     """
-    symbol_map_filename = nl_filename+".symbol_map.pickle"
+    if symbol_map_format == "pickle":
+        extension = ".symbol_map.pickle"
+    elif symbol_map_format == "columnar":
+        extension = ".symbol_map.columns"
+    else:
+        raise ValueError("Unknown symbol map format '%s'"
+                         % (symbol_map_format))
+    symbol_map_filename = nl_filename+extension
 
     # write the model and obtain the symbol_map
     _, smap_id = model.write(nl_filename,
                              format=ProblemFormat.nl,
                              io_options=kwds)
     symbol_map = model.solutions.symbol_map[smap_id]
+    if template:
+        make_nl_template(nl_filename, symbol_map)
+
+    arrays = None
+    if symbol_map_cache is not None:
+        arrays = symbol_map_arrays(symbol_map)
+        symbol_map_filename = os.path.join(
+            symbol_map_cache, structure_fingerprint(arrays)+extension)
+        if os.path.exists(symbol_map_filename):
+            return symbol_map_filename
+        os.makedirs(symbol_map_cache, exist_ok=True)
+
+    # write to a temporary file first, so that other processes
+    # sharing the cache never see a partially written file
+    tmp_filename = "%s.%d.tmp" % (symbol_map_filename, os.getpid())
+    if symbol_map_format == "columnar":
+        write_columnar_symbol_map(symbol_map if arrays is None
+                                  else arrays, tmp_filename)
+        os.replace(tmp_filename, symbol_map_filename)
+        return symbol_map_filename
 
     # save a persistent form of the symbol_map (using pickle) by
     # storing the NL file label with a ComponentUID, which is
     # an efficient lookup code for model components (created
     # by John Siirola)
+    # (older versions of Pyomo store weak references in the
+    # symbol_map)
     tmp_buffer = {} # this makes the process faster
     symbol_cuid_pairs = tuple(
-        (symbol, ComponentUID(var_weakref(), cuid_buffer=tmp_buffer))
-        for symbol, var_weakref in symbol_map.bySymbol.items())
-    with open(symbol_map_filename, "wb") as f:
+        (symbol, ComponentUID(obj() if isinstance(obj, weakref.ref)
+                              else obj, cuid_buffer=tmp_buffer))
+        for symbol, obj in symbol_map.bySymbol.items())
+    with open(tmp_filename, "wb") as f:
         pickle.dump(symbol_cuid_pairs, f)
+    os.replace(tmp_filename, symbol_map_filename)
 
     return symbol_map_filename
 
@@ -0,0 +1,208 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import os
+import csv
+import math
+import time
+import collections
+import multiprocessing
+import numpy
+import pandas
+from pyomo.environ import SolverFactory, Constraint, value
+from pyomo.opt import TerminationCondition
+from pyomo.common.collections import ComponentMap
+from pyomo.core.expr.visitor import identify_mutable_parameters
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+from diet import model
+
+def read_people(filename, batch_size=1000):
+    """
+    Reads a table with one row per person, in batches of
+    batch_size rows, from a .csv or .parquet file. Columns are
+    named after the parameters they set, e.g. 'Nmin[Cal]',
+    'Nmax[Carbo]' or 'Vmax', plus an optional 'id' column.
+    Yields pandas DataFrames.
+    """
+    if filename.endswith(".parquet"):
+        import pyarrow.parquet
+        f = pyarrow.parquet.ParquetFile(filename)
+        for batch in f.iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        for batch in pandas.read_csv(filename, chunksize=batch_size):
+            yield batch
+
+def generate_people(data_filename, filename, count, spread=0.2, seed=1000):
+    """
+    Writes a table of count people for read_people, with the
+    finite Nmin, Nmax and Vmax of data_filename scaled by
+    random factors in [1-spread, 1+spread]; the bounds of a
+    nutrient are scaled by the same factor.
+    """
+    instance = model.create_instance(data_filename)
+    rng = numpy.random.RandomState(seed)
+    columns = {"id": numpy.arange(count)}
+    for j in instance.N:
+        factor = rng.uniform(1-spread, 1+spread, count)
+        for data in (instance.Nmin[j], instance.Nmax[j]):
+            if math.isfinite(value(data)):
+                columns[data.name] = value(data) * factor
+    columns["Vmax"] = value(instance.Vmax) * rng.uniform(
+        1-spread, 1+spread, count)
+    people = pandas.DataFrame(columns)
+    if filename.endswith(".parquet"):
+        people.to_parquet(filename, index=False)
+    else:
+        people.to_csv(filename, index=False)
+
+_worker = {}
+
+def _init_worker(data_filename, solver):
+    # every worker builds the instance and the solver once
+    instance = model.create_instance(data_filename)
+    opt = SolverFactory(solver)
+    # the constraints that use each mutable parameter, which must be
+    # sent again to a persistent solver when the parameter changes
+    uses = ComponentMap()
+    for con in instance.component_data_objects(Constraint, active=True):
+        for param in identify_mutable_parameters(con.expr):
+            uses.setdefault(param, []).append(con)
+    if isinstance(opt, PersistentSolver):
+        opt.set_instance(instance)
+    _worker.update(instance=instance, opt=opt, uses=uses, columns={},
+                   defaults=ComponentMap(
+                       (data, value(data)) for data in uses))
+
+def _param(column):
+    # the parameter set by a column, e.g. 'Nmin[Cal]'
+    if column not in _worker["columns"]:
+        param = _worker["instance"].find_component(column)
+        if param is None or param not in _worker["uses"]:
+            raise ValueError("Column '%s' is not a mutable parameter of "
+                             "the diet model" % (column))
+        _worker["columns"][column] = param
+    return _worker["columns"][column]
+
+def _solve_batch(batch):
+    instance, opt = _worker["instance"], _worker["opt"]
+    persistent = isinstance(opt, PersistentSolver)
+    foods = list(instance.x.values())
+    params = [(column, _param(column)) for column in batch
+              if column != "id"]
+    rows = []
+    for k in range(len(batch["id"])):
+        changed = []
+        for column, param in params:
+            v = batch[column][k]
+            # a missing value means the value in the data file
+            if v is None or v != v:
+                v = _worker["defaults"][param]
+            if v != param.value:
+                param.value = v
+                changed.extend(_worker["uses"][param])
+        if persistent:
+            for con in set(changed):
+                opt.remove_constraint(con)
+                opt.add_constraint(con)
+            results = opt.solve(load_solutions=False, save_results=False)
+        else:
+            results = opt.solve(instance, load_solutions=False)
+        condition = results.solver.termination_condition
+        if condition == TerminationCondition.optimal:
+            if persistent:
+                opt.load_vars()
+            else:
+                instance.solutions.load_from(results)
+            rows.append([batch["id"][k], str(condition),
+                         "%.6g" % value(instance.cost)]
+                        # integer values, up to the solver tolerance
+                        + ["%.6g" % (round(x.value, 6) + 0.0)
+                           for x in foods])
+        else:
+            rows.append([batch["id"][k], str(condition), ""]
+                        + [""] * len(foods))
+    return rows
+
+def solve_people(data_filename, people_filename, output_filename,
+                 solver="appsi_highs", processes=None, batch_size=1000):
+    """
+    Solves the diet model of data_filename for every person in
+    people_filename (see read_people), and writes one row per
+    person, in input order, to the CSV file output_filename: the
+    id, the termination condition, the cost and the servings of
+    every food. Each worker process builds the instance once and
+    then only changes the values of Nmin, Nmax and Vmax before
+    each solve, with a persistent solver (an appsi solver, or a
+    persistent solver such as gurobi_persistent, whose changed
+    constraints are replaced). Batches are read, solved and
+    written as they go, with at most two batches per process in
+    flight, so the input never has to fit in memory.
+    Returns the number of people, the number of optimal solves,
+    the time taken and the solves per second.
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    start = time.time()
+    count = optimal = 0
+    pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                initargs=(data_filename, solver))
+    try:
+        with open(output_filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            header = None
+            pending = collections.deque()
+
+            def write(rows):
+                for row in rows:
+                    writer.writerow(row)
+                return sum(1 for row in rows if row[1] == "optimal")
+
+            for people in read_people(people_filename, batch_size):
+                if "id" not in people:
+                    people["id"] = range(count, count+len(people))
+                if header is None:
+                    foods = model.create_instance(data_filename).x
+                    header = ["id", "status", "cost"] + \
+                        [x.name for x in foods.values()]
+                    writer.writerow(header)
+                count += len(people)
+                pending.append(pool.apply_async(
+                    _solve_batch, (people.to_dict("list"),)))
+                if len(pending) >= 2*processes:
+                    optimal += write(pending.popleft().get())
+            while pending:
+                optimal += write(pending.popleft().get())
+    finally:
+        pool.close()
+        pool.join()
+    elapsed = time.time() - start
+    return {"people": count,
+            "optimal": optimal,
+            "time": elapsed,
+            "solves_per_second": count / elapsed if elapsed else 0.0}
+
+if __name__ == "__main__":
+    import sys
+
+    # Usage: python batch.py [people] [processes] [solver]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    solver = sys.argv[3] if len(sys.argv) > 3 else "appsi_highs"
+
+    generate_people("diet.dat", "people.csv", count)
+    summary = solve_people("diet.dat", "people.csv", "diets.csv",
+                           solver=solver, processes=processes)
+    print("Solved %d diets (%d optimal) in %.2f seconds: "
+          "%.1f solves per second"
+          % (summary["people"], summary["optimal"], summary["time"],
+             summary["solves_per_second"]))
@@ -25,12 +25,13 @@ model.c    = Param(model.F, within=PositiveReals)
 # Amount of nutrient in each food
 model.a    = Param(model.F, model.N, within=NonNegativeReals)
 # Lower and upper bound on each nutrient
-model.Nmin = Param(model.N, within=NonNegativeReals, default=0.0)
-model.Nmax = Param(model.N, within=NonNegativeReals, default=infinity)
+# (mutable, so that one instance can be solved for many people)
+model.Nmin = Param(model.N, within=NonNegativeReals, default=0.0, mutable=True)
+model.Nmax = Param(model.N, within=NonNegativeReals, default=infinity, mutable=True)
 # Volume per serving of food
 model.V    = Param(model.F, within=PositiveReals)
 # Maximum volume of food consumed
-model.Vmax = Param(within=PositiveReals)
+model.Vmax = Param(within=PositiveReals, mutable=True)
 
 # Number of servings consumed of each food
 model.x = Var(model.F, within=NonNegativeIntegers)
@@ -0,0 +1,120 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import os
+import sys
+import types
+import pickle
+import hashlib
+import importlib.util
+import pyomo.version
+
+def load_model_module(model_filename):
+    """
+    Imports a model file such as diet/diet.py and returns the
+    module. The file need not be importable by name (e.g.
+    p-median.py).
+    """
+    name = "_model_" + hashlib.sha1(
+        os.path.realpath(model_filename).encode()).hexdigest()[:12]
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, model_filename)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[name] = module
+    return sys.modules[name]
+
+def snapshot_key(model_filename, data_filename=None):
+    """
+    Returns the hash that identifies a snapshot: the model
+    source, the data file, and the Pyomo and Python versions,
+    which a pickled instance depends on.
+    """
+    key = hashlib.sha1()
+    key.update(("%s %d.%d " % ((pyomo.version.version,)
+                               + sys.version_info[:2])).encode())
+    for filename in (model_filename, data_filename):
+        if filename is not None:
+            with open(filename, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    key.update(block)
+        key.update(b"\0")
+    return key.hexdigest()
+
+def _missing_rule(name):
+    def rule(*args, **kwds):
+        raise RuntimeError("The rule '%s' is not saved in instance "
+                           "snapshots" % (name))
+    rule.__name__ = rule.__qualname__ = name
+    return rule
+
+class _Pickler(pickle.Pickler):
+    # The rules of a model file cannot be pickled, as the file is not
+    # imported by name, and are not needed once the instance is built,
+    # so they are replaced by stubs that raise an error if called
+    def __init__(self, f, module_name):
+        pickle.Pickler.__init__(self, f, pickle.HIGHEST_PROTOCOL)
+        self.module_name = module_name
+
+    def reducer_override(self, obj):
+        if isinstance(obj, types.FunctionType) and \
+           obj.__module__ == self.module_name:
+            return _missing_rule, (obj.__qualname__,)
+        return NotImplemented
+
+def create_instance(model_filename, data_filename=None,
+                    cache_dir="snapshots", model_name="model"):
+    """
+    Returns the instance of the AbstractModel model_name in
+    model_filename with the data in data_filename, from a
+    snapshot in cache_dir if there is one for this model source
+    and data file. Otherwise the instance is created with
+    create_instance and a snapshot is saved: the pickled
+    instance, without the rules of the model file. Rules are
+    only needed to build the instance, so a restored instance
+    can be solved and changed as usual, but components that
+    call a rule again (e.g. to add an index) raise an error.
+    """
+    filename = os.path.join(cache_dir, "%s.instance.pickle"
+                            % (snapshot_key(model_filename, data_filename)))
+    if os.path.exists(filename):
+        with open(filename, "rb") as f:
+            return pickle.load(f)
+
+    module = load_model_module(model_filename)
+    instance = getattr(module, model_name).create_instance(data_filename)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    # write to a temporary file first, so that other processes never
+    # see a partial snapshot
+    tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+    with open(tmp_filename, "wb") as f:
+        _Pickler(f, module.__name__).dump(instance)
+    os.replace(tmp_filename, filename)
+    return instance
+
+if __name__ == "__main__":
+    import time
+    # snapshots must refer to this module by name, not as __main__
+    import snapshot
+
+    # Usage: python snapshot.py model.py [data.dat]
+    model_filename = sys.argv[1]
+    data_filename = sys.argv[2] if len(sys.argv) > 2 else None
+    key = snapshot.snapshot_key(model_filename, data_filename)
+    cached = os.path.exists(os.path.join("snapshots",
+                                         "%s.instance.pickle" % (key)))
+    start = time.time()
+    instance = snapshot.create_instance(model_filename, data_filename)
+    print("%s instance in %.3f seconds (snapshot %s)"
+          % ("Restored" if cached else "Created", time.time() - start,
+             key))
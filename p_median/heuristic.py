@@ -0,0 +1,221 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import os
+import time
+import multiprocessing
+import numpy
+from instance import load_cost_matrix
+
+def _nearest(c, sites, chunksize):
+    # the nearest and second nearest of the open sites for every
+    # customer, as a position in sites and two costs
+    n = c.shape[1]
+    position = numpy.empty(n, dtype=numpy.int64)
+    d1 = numpy.empty(n)
+    d2 = numpy.full(n, numpy.inf)
+    for start in range(0, n, chunksize):
+        block = numpy.asarray(c[sites, start:start+chunksize])
+        if len(sites) > 1:
+            two = numpy.argpartition(block, 1, axis=0)[:2]
+            cost = numpy.take_along_axis(block, two, axis=0)
+            first = numpy.argmin(cost, axis=0)
+            position[start:start+chunksize] = \
+                two[first, numpy.arange(block.shape[1])]
+            d1[start:start+chunksize] = cost.min(axis=0)
+            d2[start:start+chunksize] = cost.max(axis=0)
+        else:
+            position[start:start+chunksize] = 0
+            d1[start:start+chunksize] = block[0]
+    return position, d1, d2
+
+def _best_swap(c, w, sites, position, d1, d2, chunksize):
+    # change of the cost for every (location to open, position of
+    # the site to close) pair:
+    #   sum_j w[j]*(min(c[f,j], d1[j]) - d1[j])
+    # for opening f, plus, for the customers of the closed site,
+    #   sum_j w[j]*(min(c[f,j], d2[j]) - min(c[f,j], d1[j]))
+    m, n = c.shape
+    p = len(sites)
+    gain = numpy.zeros(m)
+    loss = numpy.zeros((m, p))
+    for start in range(0, n, chunksize):
+        block = numpy.asarray(c[:, start:start+chunksize])
+        wb = w[start:start+chunksize]
+        first = numpy.minimum(block, d1[start:start+chunksize])
+        gain += (first - d1[start:start+chunksize]).dot(wb)
+        extra = (numpy.minimum(block, d2[start:start+chunksize]) - first) * wb
+        # one column per open site, summed over its customers
+        owner = numpy.zeros((block.shape[1], p))
+        owner[numpy.arange(block.shape[1]),
+              position[start:start+chunksize]] = 1.0
+        loss += extra.dot(owner)
+    delta = gain[:, None] + loss
+    delta[sites] = numpy.inf
+    f, r = numpy.unravel_index(numpy.argmin(delta), delta.shape)
+    return f, r, delta[f, r]
+
+def interchange(c, p, d=None, start=None, seed=None, max_swaps=None,
+                tol=1e-9, chunksize=2000):
+    """
+    Improves a p-median solution by swapping open and closed
+    locations (vertex substitution, as in Teitz and Bart) until
+    no swap lowers the cost. c is the (m, n) cost matrix, which
+    may be memory mapped, d the customer demands (1.0 by
+    default) and start the 0-based open locations to start
+    from; by default p random locations, drawn with seed.
+    The nearest and second nearest open site of every customer
+    are kept, so all the m*p swaps are evaluated together with
+    a few array operations over the cost matrix, read chunksize
+    customers at a time, and the best one is made.
+    Returns a dictionary with the cost, the sorted open
+    locations, the location serving each customer (0-based),
+    the number of swaps and the time taken.
+    """
+    begin = time.time()
+    m, n = c.shape
+    w = numpy.ones(n) if d is None else numpy.asarray(d, dtype=float)
+    if start is None:
+        start = numpy.random.RandomState(seed).choice(m, p, replace=False)
+    sites = numpy.array(start, dtype=numpy.int64)
+    if len(sites) != p or len(numpy.unique(sites)) != p:
+        raise ValueError("start must have p different locations")
+
+    position, d1, d2 = _nearest(c, sites, chunksize)
+    swaps = 0
+    while p < m and (max_swaps is None or swaps < max_swaps):
+        f, r, delta = _best_swap(c, w, sites, position, d1, d2, chunksize)
+        if delta > -tol:
+            break
+        sites[r] = f
+        position, d1, d2 = _nearest(c, sites, chunksize)
+        swaps += 1
+    return {"cost": float(w.dot(d1)),
+            "open": numpy.sort(sites),
+            "assign": sites[position],
+            "swaps": swaps,
+            "time": time.time() - begin}
+
+def greedy(c, p, d=None, sites=(), chunksize=2000):
+    """
+    Extends the 0-based open locations in sites to p locations,
+    adding each time the location that lowers the cost most,
+    and returns them as an array. With no sites this is the
+    greedy (add) heuristic for the p-median problem.
+    """
+    m, n = c.shape
+    w = numpy.ones(n) if d is None else numpy.asarray(d, dtype=float)
+    sites = [int(i) for i in sites]
+    if len(sites):
+        d1 = _nearest(c, numpy.array(sites), chunksize)[1]
+    else:
+        d1 = numpy.full(n, numpy.inf)
+    while len(sites) < p:
+        gain = numpy.zeros(m)
+        for start in range(0, n, chunksize):
+            block = numpy.asarray(c[:, start:start+chunksize])
+            current = d1[start:start+chunksize]
+            # the first location is the one with the lowest total cost
+            saving = numpy.where(numpy.isinf(current), -block,
+                                 numpy.maximum(current - block, 0))
+            gain += saving.dot(w[start:start+chunksize])
+        gain[sites] = -numpy.inf
+        f = int(numpy.argmax(gain))
+        sites.append(f)
+        d1 = numpy.minimum(d1, numpy.asarray(c[f]))
+    return numpy.array(sites, dtype=numpy.int64)
+
+_cost_matrix = None
+
+def _init_worker(c):
+    # the cost matrix is sent once per worker, or just its file name
+    global _cost_matrix
+    _cost_matrix = load_cost_matrix(c) if isinstance(c, str) else c
+
+def _run_start(task):
+    p, d, seed, kwds = task
+    result = interchange(_cost_matrix, p, d, seed=seed, **kwds)
+    result["seed"] = seed
+    return result
+
+def multi_start(c, p, d=None, starts=8, processes=None, seed=0, **kwds):
+    """
+    Runs interchange from starts random solutions, with seeds
+    seed, seed+1, ..., in a pool of processes, and returns the
+    best result, with the costs of all the starts in 'costs'.
+    c is a cost matrix or the name of a .npy file saved with
+    save_cost_matrix; a file is memory mapped by every worker
+    instead of being copied to it. The other keywords are
+    passed on to interchange.
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    processes = max(1, min(processes, starts))
+    tasks = [(p, d, seed+s, kwds) for s in range(starts)]
+    pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                initargs=(c,))
+    try:
+        results = pool.map(_run_start, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    best = min(results, key=lambda result: result["cost"])
+    best["costs"] = [result["cost"] for result in results]
+    return best
+
+def start_values(result, m):
+    """
+    Returns the y and x values of a result of interchange, as
+    dictionaries with the 1-based indices of the p-median
+    model: y[i] for every location, and x[i,j] for the
+    location that serves each customer (the other x are 0).
+    """
+    y = dict((i, 0.0) for i in range(1, m+1))
+    for i in result["open"].tolist():
+        y[i+1] = 1.0
+    x = dict(((i+1, j+1), 1.0)
+             for j, i in enumerate(result["assign"].tolist()))
+    return y, x
+
+def load_start(model, result):
+    """
+    Loads a result of interchange into the y and x variables of
+    a p-median model (from p-median.py or instance.py), so that
+    it can be used as a MIP start with solvers that accept one,
+    e.g. opt.solve(model, warmstart=True).
+    """
+    y, x = start_values(result, len(model.y))
+    for i, v in y.items():
+        model.y[i].value = v
+    for index, var in model.x.items():
+        var.value = x.get(index, 0.0)
+
+if __name__ == "__main__":
+    import sys
+    from instance import generate_instance, cost_matrix, save_cost_matrix
+
+    # Usage: python heuristic.py [m n p [starts]]
+    args = [int(v) for v in sys.argv[1:]]
+    # missing arguments keep their defaults
+    m, n, p = args[:3] + [500, 5000, 20][len(args):]
+    starts = args[3] if len(args) > 3 else 8
+
+    facilities, customers, demand = generate_instance(m, n)
+    save_cost_matrix("costs.npy", cost_matrix(facilities, customers))
+    start = time.time()
+    best = multi_start("costs.npy", p, demand, starts=starts)
+    print("Best of %d starts: cost %.4f in %.3f seconds"
+          % (starts, best["cost"], time.time() - start))
+    print("Costs of the starts: %s"
+          % (" ".join("%.4f" % v for v in best["costs"])))
+    print("Open locations: %s" % (" ".join(str(i+1)
+                                             for i in best["open"])))
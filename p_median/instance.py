@@ -0,0 +1,393 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import time
+import numpy
+from pyomo.environ import *
+from pyomo.core.expr.numeric_expr import LinearExpression
+
+def generate_instance(m, n, seed=1000):
+    """
+    Generates a random p-median instance with m candidate
+    locations and n customers in the unit square. Returns the
+    coordinates of the locations and the customers, as (m, 2)
+    and (n, 2) arrays, and the customer demands.
+    """
+    rng = numpy.random.RandomState(seed)
+    facilities = rng.rand(m, 2)
+    customers = rng.rand(n, 2)
+    demand = rng.randint(1, 10, n).astype(float)
+    return facilities, customers, demand
+
+def cost_matrix(facilities, customers):
+    """
+    Returns the (m, n) matrix of Euclidean distances between
+    the locations and the customers, computed in one pass.
+    """
+    facilities = numpy.asarray(facilities, dtype=float)
+    customers = numpy.asarray(customers, dtype=float)
+    c = (numpy.sum(facilities**2, axis=1)[:, None]
+         + numpy.sum(customers**2, axis=1)[None, :]
+         - 2 * facilities.dot(customers.T))
+    # rounding can make the squares slightly negative
+    numpy.maximum(c, 0, out=c)
+    return numpy.sqrt(c, out=c)
+
+def save_cost_matrix(filename, c):
+    """
+    Saves a cost matrix in NumPy's .npy format.
+    """
+    numpy.save(filename, numpy.asarray(c, dtype=float))
+
+def load_cost_matrix(filename):
+    """
+    Returns the cost matrix in a .npy file, memory mapped so
+    that only the parts that are used are read.
+    """
+    return numpy.load(filename, mmap_mode="r")
+
+def create_model(c, p, d=None, linking="full"):
+    """
+    Creates the p-median model of p-median.py as a
+    ConcreteModel, with the (m, n) cost matrix c, p
+    facilities and the customer demands d (1.0 by default).
+    The components have the same names as in p-median.py.
+    The cost parameter is filled row by row from the array,
+    instead of one random.uniform call per entry.
+    With linking="aggregated" the openfac rows are replaced by
+    one row per location, sum_j x[i,j] <= n*y[i], and with
+    linking=None there are no linking rows at all; openfac is
+    then empty, and rows can be added to it by solve_lazy.
+    """
+    m, n = c.shape
+    if d is None:
+        d = numpy.ones(n)
+
+    model = ConcreteModel()
+    model.m = Param(within=PositiveIntegers, initialize=m)
+    model.n = Param(within=PositiveIntegers, initialize=n)
+    model.M = RangeSet(1, model.m)
+    model.N = RangeSet(1, model.n)
+    # p is mutable, so that one instance can be solved for several p
+    model.p = Param(within=RangeSet(1, model.n), initialize=p,
+                    mutable=True)
+    demand = numpy.asarray(d, dtype=float).tolist()
+    model.d = Param(model.N, initialize=lambda model, j: demand[j-1])
+    # A rule that reads the array is much faster than a dictionary,
+    # whose keys Pyomo would have to check one by one
+    rows = {}
+    def c_(model, i, j):
+        if i not in rows:
+            rows.clear()
+            rows[i] = c[i-1].tolist()
+        return rows[i][j-1]
+    model.c = Param(model.M, model.N, initialize=c_, within=Reals)
+
+    model.x = Var(model.M, model.N, bounds=(0.0, 1.0))
+    model.y = Var(model.M, within=Binary)
+
+    # The objective coefficients d[j]*c[i,j] are computed with NumPy,
+    # in the same order as the x variables
+    def cost_(model):
+        coefs = (numpy.asarray(c) * numpy.asarray(demand)[None, :])
+        return LinearExpression(constant=0,
+                                linear_coefs=coefs.ravel().tolist(),
+                                linear_vars=list(model.x.values()))
+    model.cost = Objective(rule=cost_)
+
+    def demand_(model, j):
+        return sum(model.x[i,j] for i in model.M) == 1.0
+    model.demand = Constraint(model.N, rule=demand_)
+
+    def facilities_(model):
+        return sum(model.y[i] for i in model.M) == model.p
+    model.facilities = Constraint(rule=facilities_)
+
+    def openfac_(model, i, j):
+        return model.x[i,j] <= model.y[i]
+    if linking == "full":
+        model.openfac = Constraint(model.M, model.N, rule=openfac_)
+    else:
+        model.openfac = Constraint(model.M, model.N)
+    if linking == "aggregated":
+        def aggregated_(model, i):
+            return sum(model.x[i,j] for j in model.N) <= model.n*model.y[i]
+        model.aggregated = Constraint(model.M, rule=aggregated_)
+    elif linking not in ("full", None):
+        raise ValueError("Unknown linking '%s'" % (linking))
+    return model
+
+def violated_openfac(model, tol=1e-6):
+    """
+    Returns the (i, j) pairs, 1-based, whose openfac row
+    x[i,j] <= y[i] is violated by more than tol in the current
+    solution of a model from create_model.
+    """
+    m, n = value(model.m), value(model.n)
+    x = numpy.fromiter((v.value or 0.0 for v in model.x.values()),
+                       dtype=float, count=m*n).reshape(m, n)
+    y = numpy.array([model.y[i].value or 0.0 for i in model.M])
+    return [(i+1, j+1) for i, j in
+            numpy.argwhere(x - y[:, None] > tol).tolist()]
+
+def solve_lazy(c, p, d=None, linking="aggregated", solver="glpk",
+               tol=1e-6, max_rounds=100):
+    """
+    Solves the p-median model with the openfac rows added only
+    when they are violated. The model starts with the given
+    linking (see create_model). First the LP relaxation is
+    solved, the violated openfac rows are added and it is
+    solved again, until no row is violated; these rows are the
+    ones that tighten the relaxation. Then y is made binary
+    and the MIP is solved in the same way. With aggregated
+    linking the MIP is exact, so it is solved once; without
+    linking rows more rows may be needed. Returns the model
+    and a list with the phase ('lp' or 'mip'), the number of
+    rows added, the total number of openfac rows, the
+    objective and the solve time of each round.
+    """
+    model = create_model(c, p, d, linking=linking)
+    opt = SolverFactory(solver)
+    rounds = []
+    for phase in ("lp", "mip"):
+        for i in model.M:
+            model.y[i].domain = UnitInterval if phase == "lp" else Binary
+        for r in range(max_rounds):
+            start = time.time()
+            opt.solve(model)
+            rows = violated_openfac(model, tol)
+            for i, j in rows:
+                model.openfac[i,j] = model.x[i,j] <= model.y[i]
+            rounds.append({"phase": phase,
+                           "added": len(rows),
+                           "rows": len(model.openfac),
+                           "objective": value(model.cost),
+                           "time": time.time() - start})
+            if not rows:
+                break
+    return model, rounds
+
+def nearest_sites(k, facilities=None, customers=None, c=None,
+                  index=None, chunksize=1000):
+    """
+    Returns the k nearest candidate locations of the customers
+    in index (all customers by default), as an (len(index), k)
+    array of 0-based locations sorted by cost, together with a
+    (len(index), k+1) array of their costs followed by the cost
+    of the next nearest location (inf if there is none). The
+    costs come either from the coordinates, through a KD-tree,
+    or from a cost matrix c, which is read chunksize customers
+    at a time so that it can be memory mapped.
+    """
+    if c is not None:
+        m, n = c.shape
+    else:
+        m, n = len(facilities), len(customers)
+    if index is None:
+        index = numpy.arange(n)
+    k = min(k, m)
+    dist = numpy.full((len(index), k+1), numpy.inf)
+    if c is None:
+        from scipy.spatial import cKDTree
+        d, sites = cKDTree(facilities).query(customers[index],
+                                             k=min(k+1, m))
+        d = d.reshape(len(index), -1)
+        sites = sites.reshape(len(index), -1)
+        dist[:, :d.shape[1]] = d
+        return sites[:, :k], dist
+
+    sites = numpy.empty((len(index), k), dtype=numpy.int64)
+    for start in range(0, len(index), chunksize):
+        block = numpy.asarray(c[:, index[start:start+chunksize]]).T
+        # partition to find the k+1 smallest, then sort just those
+        near = numpy.argpartition(block, min(k, m-1), axis=1)[:, :k+1]
+        near_cost = numpy.take_along_axis(block, near, axis=1)
+        order = numpy.argsort(near_cost, axis=1)
+        near = numpy.take_along_axis(near, order, axis=1)
+        sites[start:start+chunksize] = near[:, :k]
+        dist[start:start+chunksize, :near.shape[1]] = \
+            numpy.take_along_axis(near_cost, order, axis=1)
+    return sites, dist
+
+def create_sparse_model(sites, dist, p, d=None, m=None):
+    """
+    Creates a p-median model in which customer j can only be
+    assigned to the locations in sites[j] (0-based), with the
+    costs in dist[j]. A customer may instead be served from
+    'outside' (z[j]) at the cost dist[j][-1], the cost of the
+    nearest location that is not in sites[j]. That is a lower
+    bound on the cost of any location left out, so the model
+    is a relaxation of the full p-median model, and a solution
+    that serves nobody from outside is optimal for the full
+    model. sites and dist are lists with one array per
+    customer, as they may have different lengths; m is the
+    number of locations.
+    """
+    n = len(sites)
+    if d is None:
+        d = numpy.ones(n)
+    demand = numpy.asarray(d, dtype=float).tolist()
+    pairs = [(int(i)+1, j+1) for j in range(n) for i in sites[j]]
+    costs = [float(v) for j in range(n) for v in dist[j][:-1]]
+    outside = [float(dist[j][-1]) for j in range(n)]
+    if m is None:
+        m = max(int(s.max()) for s in sites if len(s)) + 1
+
+    model = ConcreteModel()
+    model.m = Param(within=PositiveIntegers, initialize=m)
+    model.n = Param(within=PositiveIntegers, initialize=n)
+    model.M = RangeSet(1, model.m)
+    model.N = RangeSet(1, model.n)
+    model.p = Param(within=RangeSet(1, model.n), initialize=p)
+    model.d = Param(model.N, initialize=lambda model, j: demand[j-1])
+    # A[i,j] - the location-customer pairs that have a variable
+    model.A = Set(dimen=2, initialize=pairs, ordered=True)
+    cost_of = dict(zip(pairs, costs))
+    model.c = Param(model.A, initialize=lambda model, i, j: cost_of[i,j],
+                    within=Reals)
+    model.outside = Param(model.N,
+                          initialize=lambda model, j: outside[j-1],
+                          within=Reals)
+
+    model.x = Var(model.A, bounds=(0.0, 1.0))
+    model.y = Var(model.M, within=Binary)
+    # z[j] - fraction of the demand of customer j served from outside
+    # its candidate locations; not allowed if it has all of them
+    model.z = Var(model.N, bounds=lambda model, j:
+                  (0.0, 1.0 if outside[j-1] < numpy.inf else 0.0))
+
+    def cost_(model):
+        coefs = [demand[j-1]*v for (i, j), v in zip(pairs, costs)]
+        coefs += [demand[j]*v if v < numpy.inf else 0.0
+                  for j, v in enumerate(outside)]
+        return LinearExpression(constant=0, linear_coefs=coefs,
+                                linear_vars=list(model.x.values())
+                                + list(model.z.values()))
+    model.cost = Objective(rule=cost_)
+
+    def demand_(model, j):
+        return sum(model.x[int(i)+1,j] for i in sites[j-1]) + \
+            model.z[j] == 1.0
+    model.demand = Constraint(model.N, rule=demand_)
+
+    def facilities_(model):
+        return sum(model.y[i] for i in model.M) == model.p
+    model.facilities = Constraint(rule=facilities_)
+
+    def openfac_(model, i, j):
+        return model.x[i,j] <= model.y[i]
+    model.openfac = Constraint(model.A, rule=openfac_)
+    return model
+
+def solve_sparse(p, k=10, facilities=None, customers=None, c=None,
+                 d=None, solver="glpk", max_rounds=20):
+    """
+    Solves the p-median problem with the sparse model from
+    create_sparse_model, starting with the k nearest locations
+    of every customer. While the solution serves some customers
+    from outside their candidate locations, their number of
+    candidates is doubled and the model is solved again, so
+    the final solution is optimal for the full model. Memory
+    grows with the total number of candidates, not with the
+    size of the cost matrix. Returns the last model and a list
+    with the number of variables, the number of customers
+    served from outside and the solve time of each round.
+    """
+    n = len(customers) if c is None else c.shape[1]
+    m = len(facilities) if c is None else c.shape[0]
+    ks = numpy.full(n, min(k, m))
+    sites = [None]*n
+    dist = [None]*n
+    widen = numpy.arange(n)
+    rounds = []
+    opt = SolverFactory(solver)
+    for r in range(max_rounds):
+        # only the customers whose k changed are queried again
+        for kk in numpy.unique(ks[widen]):
+            index = widen[ks[widen] == kk]
+            s, dd = nearest_sites(kk, facilities, customers, c, index)
+            for pos, j in enumerate(index.tolist()):
+                sites[j] = s[pos]
+                dist[j] = dd[pos]
+        start = time.time()
+        model = create_sparse_model(sites, dist, p, d, m)
+        opt.solve(model)
+        widen = numpy.array([j-1 for j in model.N
+                             if model.z[j].value > 1e-6], dtype=int)
+        rounds.append({"variables": len(model.x),
+                       "outside": len(widen),
+                       "time": time.time() - start})
+        if len(widen) == 0:
+            break
+        ks[widen] = numpy.minimum(2*ks[widen], m)
+    return model, rounds
+
+if __name__ == "__main__":
+    import sys
+    import importlib.util
+
+    # Usage: python instance.py [m n p [k]] [lazy]
+    # k solves the sparse model, lazy compares the lazy openfac rows
+    # with the full formulation
+    lazy = "lazy" in sys.argv
+    args = [int(v) for v in sys.argv[1:] if v != "lazy"]
+    # missing arguments keep their defaults
+    m, n, p = args[:3] + [100, 1000, 5][len(args):]
+    k = args[3] if len(args) > 3 else None
+
+    # the random costs of p-median.py
+    spec = importlib.util.spec_from_file_location("p_median_model",
+                                                  "p-median.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    start = time.time()
+    abstract = module.model.create_instance(
+        data={None: {"m": {None: m}, "n": {None: n}, "p": {None: p}}})
+    print("p-median.py instance:      %8.3f seconds"
+          % (time.time() - start))
+
+    # the same model with costs from coordinates
+    start = time.time()
+    facilities, customers, demand = generate_instance(m, n)
+    c = cost_matrix(facilities, customers)
+    generated = time.time() - start
+    save_cost_matrix("costs.npy", c)
+    start = time.time()
+    model = create_model(load_cost_matrix("costs.npy"), p, demand)
+    print("Cost matrix from coordinates: %8.3f seconds" % (generated))
+    print("Instance from the cost matrix: %8.3f seconds"
+          % (time.time() - start))
+
+    if k is not None:
+        # the sparse model, widened until nobody is served from outside
+        start = time.time()
+        model, rounds = solve_sparse(p, k, facilities, customers, d=demand)
+        for r, info in enumerate(rounds):
+            print("Round %d: %8d variables %6d outside %8.3f seconds"
+                  % (r, info["variables"], info["outside"], info["time"]))
+        print("Sparse model: cost %.4f in %.3f seconds (full model has "
+              "%d variables)" % (value(model.cost), time.time() - start,
+                                 m*n))
+
+    if lazy:
+        start = time.time()
+        model = create_model(c, p, demand)
+        SolverFactory("glpk").solve(model)
+        print("Full model: cost %.4f with %d openfac rows in %.3f seconds"
+              % (value(model.cost), len(model.openfac), time.time() - start))
+        for linking in ("aggregated", None):
+            start = time.time()
+            model, rounds = solve_lazy(c, p, demand, linking=linking)
+            print("Lazy rows from %s linking: cost %.4f with %d openfac "
+                  "rows in %d rounds, %.3f seconds"
+                  % (linking or "no", value(model.cost), rounds[-1]["rows"],
+                     len(rounds), time.time() - start))
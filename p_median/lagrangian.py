@@ -0,0 +1,167 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import time
+import numpy
+from heuristic import interchange
+
+def _subproblem(c, w, u, chunksize):
+    # with multipliers u on the demand rows, opening location i is
+    # worth rho[i] = sum_j min(0, w[j]*c[i,j] - u[j]); the relaxation
+    # opens the p locations with the smallest rho
+    m, n = c.shape
+    rho = numpy.zeros(m)
+    for start in range(0, n, chunksize):
+        block = numpy.asarray(c[:, start:start+chunksize])
+        reduced = (block * w[start:start+chunksize]
+                   - u[start:start+chunksize])
+        rho += numpy.minimum(reduced, 0).sum(axis=1)
+    return rho
+
+def _evaluate(c, w, u, sites, chunksize):
+    # the subgradient of the demand rows, 1 - sum_i x[i,j], for the
+    # relaxed solution, and the cost of serving every customer from
+    # its nearest site, which is a feasible p-median solution
+    n = c.shape[1]
+    subgradient = numpy.ones(n)
+    nearest = numpy.empty(n, dtype=numpy.int64)
+    cost = 0.0
+    for start in range(0, n, chunksize):
+        block = numpy.asarray(c[sites, start:start+chunksize])
+        wb = w[start:start+chunksize]
+        subgradient[start:start+chunksize] -= \
+            (block * wb - u[start:start+chunksize] < 0).sum(axis=0)
+        nearest[start:start+chunksize] = numpy.argmin(block, axis=0)
+        cost += block.min(axis=0).dot(wb)
+    return subgradient, cost, sites[nearest]
+
+def lagrangian(c, p, d=None, start=None, gap=1e-3, max_iterations=1000,
+               step=2.0, patience=5, min_step=1e-4, time_limit=None,
+               improve=True, chunksize=2000, verbose=False):
+    """
+    Solves the Lagrangian relaxation of the p-median model in
+    which the demand rows, sum_i x[i,j] == 1, are moved into the
+    objective with multipliers u[j]. The relaxation then splits
+    by location and is solved with a few array operations over
+    the cost matrix c, which may be memory mapped and is read
+    chunksize customers at a time; d are the customer demands
+    (1.0 by default).
+
+    Every iteration gives a lower bound, and serving the
+    customers from the p locations that the relaxation opens
+    gives a feasible solution and an upper bound. The
+    multipliers are updated with subgradient steps of length
+    step*(upper - lower)/|g|^2; step is halved when the lower
+    bound has not improved for patience iterations. It stops
+    when the relative gap is below gap, the step is below
+    min_step, or after max_iterations or time_limit seconds.
+    start may give p open locations (0-based) of a known
+    solution, e.g. from the interchange heuristic; its cost
+    is the first upper bound, and a good one gives much
+    better steps. With improve, the best solution is then
+    improved with the interchange heuristic.
+
+    Returns a dictionary with the best lower and upper bounds,
+    the relative gap, the open locations and the location
+    serving each customer (0-based) of the best solution, the
+    multipliers, and a history of (iteration, lower, upper,
+    seconds) tuples.
+    """
+    begin = time.time()
+    m, n = c.shape
+    w = numpy.ones(n) if d is None else numpy.asarray(d, dtype=float)
+    # start with each customer's cost from its nearest location
+    u = numpy.full(n, numpy.inf)
+    for j in range(0, n, chunksize):
+        block = numpy.asarray(c[:, j:j+chunksize])
+        u[j:j+chunksize] = block.min(axis=0) * w[j:j+chunksize]
+
+    best = {"lower": -numpy.inf, "upper": numpy.inf, "gap": numpy.inf,
+            "history": []}
+    if start is not None:
+        sites = numpy.array(start, dtype=numpy.int64)
+        _, best["upper"], best["assign"] = _evaluate(c, w, u, sites,
+                                                     chunksize)
+        best["open"] = numpy.sort(sites)
+    since = 0
+    for iteration in range(max_iterations):
+        rho = _subproblem(c, w, u, chunksize)
+        if p < m:
+            sites = numpy.argpartition(rho, p-1)[:p]
+        else:
+            sites = numpy.arange(m)
+        lower = u.sum() + rho[sites].sum()
+        subgradient, upper, assign = _evaluate(c, w, u, sites, chunksize)
+
+        if lower > best["lower"]:
+            best["lower"] = lower
+            best["u"] = u.copy()
+            since = 0
+        else:
+            since += 1
+        if upper < best["upper"]:
+            best["upper"] = upper
+            best["open"] = numpy.sort(sites)
+            best["assign"] = assign
+        best["gap"] = (best["upper"] - best["lower"]) / abs(best["upper"])
+        best["history"].append((iteration, lower, upper,
+                                time.time() - begin))
+        if verbose:
+            print("%6d %16.6f %16.6f %10.6f %8.3f"
+                  % (iteration, best["lower"], best["upper"], best["gap"],
+                     time.time() - begin))
+
+        norm = subgradient.dot(subgradient)
+        if best["gap"] <= gap or norm == 0:
+            # a zero subgradient means the relaxed solution is feasible,
+            # and so optimal
+            break
+        if since >= patience:
+            step /= 2
+            since = 0
+            if step < min_step:
+                break
+        if time_limit is not None and time.time() - begin > time_limit:
+            break
+        u += step * (best["upper"] - lower) / norm * subgradient
+    best["iterations"] = len(best["history"])
+
+    if improve and best["gap"] > gap:
+        result = interchange(c, p, d, start=best["open"],
+                             chunksize=chunksize)
+        if result["cost"] < best["upper"]:
+            best["upper"] = result["cost"]
+            best["open"] = result["open"]
+            best["assign"] = result["assign"]
+            best["gap"] = ((best["upper"] - best["lower"])
+                           / abs(best["upper"]))
+    return best
+
+if __name__ == "__main__":
+    import sys
+    from instance import generate_instance, cost_matrix
+
+    # Usage: python lagrangian.py [m n p]
+    # missing arguments keep their defaults
+    args = [int(v) for v in sys.argv[1:4]]
+    m, n, p = args + [1000, 20000, 50][len(args):]
+
+    start = time.time()
+    facilities, customers, demand = generate_instance(m, n)
+    c = cost_matrix(facilities, customers)
+    print("Cost matrix: %.3f seconds" % (time.time() - start))
+    print("%6s %16s %16s %10s %8s"
+          % ("Iter", "Lower", "Upper", "Gap", "Seconds"))
+    result = lagrangian(c, p, demand, verbose=True)
+    print("Lower bound %.6f, upper bound %.6f, gap %.4f%% after %d "
+          "iterations" % (result["lower"], result["upper"],
+                          100*result["gap"], result["iterations"]))
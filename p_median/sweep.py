@@ -0,0 +1,131 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import os
+import time
+import multiprocessing
+from pyomo.environ import SolverFactory, value, check_optimal_termination
+from instance import create_model, load_cost_matrix
+from heuristic import greedy, interchange, load_start
+
+_worker = {}
+
+def _init_worker(c, d, solver):
+    # every worker builds the instance once, for all its values of p
+    c = load_cost_matrix(c) if isinstance(c, str) else c
+    _worker["c"] = c
+    _worker["d"] = d
+    _worker["model"] = create_model(c, 1, d)
+    _worker["opt"] = SolverFactory(solver)
+
+def _solve_range(ps):
+    c, d = _worker["c"], _worker["d"]
+    model, opt = _worker["model"], _worker["opt"]
+    warmstart = opt.warm_start_capable()
+    sites = ()
+    rows = []
+    for p in ps:
+        start = time.time()
+        # the previous solution with greedily added locations,
+        # improved by interchange, is the start for this p
+        heuristic = interchange(c, p, d, start=greedy(c, p, d, sites))
+        load_start(model, heuristic)
+        model.p = p
+        started = time.time()
+        if warmstart:
+            results = opt.solve(model, warmstart=True, load_solutions=False)
+        else:
+            results = opt.solve(model, load_solutions=False)
+        solved = time.time()
+        if check_optimal_termination(results):
+            model.solutions.load_from(results)
+            sites = [i-1 for i in model.y if model.y[i].value > 0.5]
+            cost = value(model.cost)
+            opened = [i+1 for i in sites]
+        else:
+            # no solution for this p: record the failure and start
+            # the next p from the heuristic
+            sites = heuristic["open"].tolist()
+            cost = opened = None
+        rows.append({"p": p,
+                     "status": str(results.solver.termination_condition),
+                     "cost": cost,
+                     "start": heuristic["cost"],
+                     "open": opened,
+                     "heuristic_time": started - start,
+                     "solve_time": solved - started,
+                     "pid": os.getpid()})
+    return rows
+
+def sweep(c, ps, d=None, solver="glpk", processes=None):
+    """
+    Solves the p-median model for every p in ps. The values of
+    p, in increasing order, are split into one contiguous range
+    per process. Each worker builds the instance once, with p as
+    a mutable parameter, and solves its range in order, starting
+    the solve for each p from the previous solution with more
+    locations opened greedily and improved by the interchange
+    heuristic (as a MIP start, if the solver accepts one).
+    c is the cost matrix or the name of a .npy file saved with
+    save_cost_matrix, and d the customer demands.
+    Returns one row per p, in order, with the termination
+    condition, the cost, the cost of the heuristic start, the
+    open locations (1-based) and the times spent in the heuristic
+    and the solver. The cost and open locations are None for the
+    values of p whose solve did not end optimally.
+    """
+    ps = sorted(ps)
+    if processes is None:
+        processes = os.cpu_count()
+    processes = max(1, min(processes, len(ps)))
+    # consecutive values in one worker, so each start is close
+    size = -(-len(ps) // processes)
+    ranges = [ps[i:i+size] for i in range(0, len(ps), size)]
+    pool = multiprocessing.Pool(len(ranges), initializer=_init_worker,
+                                initargs=(c, d, solver))
+    try:
+        results = pool.map(_solve_range, ranges, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    return [row for rows in results for row in rows]
+
+if __name__ == "__main__":
+    import sys
+    from instance import generate_instance, cost_matrix, save_cost_matrix
+
+    # Usage: python sweep.py [m n pmin pmax [processes]]
+    args = [int(v) for v in sys.argv[1:]]
+    # missing arguments keep their defaults
+    m, n, pmin, pmax = args[:4] + [20, 200, 1, 10][len(args):]
+    processes = args[4] if len(args) > 4 else None
+
+    facilities, customers, demand = generate_instance(m, n)
+    save_cost_matrix("costs.npy", cost_matrix(facilities, customers))
+    start = time.time()
+    table = sweep("costs.npy", range(pmin, pmax+1), demand,
+                  processes=processes)
+    elapsed = time.time() - start
+
+    print("%4s %14s %14s %10s %10s  %s" % ("p", "Cost", "Start",
+                                           "Heuristic", "Solve", "Open"))
+    for row in table:
+        if row["cost"] is None:
+            print("%4d %14s %14.4f %10.3f %10.3f  %s"
+                  % (row["p"], "-", row["start"], row["heuristic_time"],
+                     row["solve_time"], row["status"]))
+            continue
+        print("%4d %14.4f %14.4f %10.3f %10.3f  %s"
+              % (row["p"], row["cost"], row["start"],
+                 row["heuristic_time"], row["solve_time"],
+                 " ".join(str(i) for i in row["open"])))
+    print("Solved %d values of p in %.3f seconds" % (len(table), elapsed))
@@ -0,0 +1,112 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import os
+import sys
+import time
+import tempfile
+import numpy
+import pandas
+# Import scipy up front, so that its import time is not counted
+import scipy.optimize
+from min_cost_flow import MinCostFlow, readTable
+
+def generate_network(nodes, arcs, seed=1000):
+    """Generate random nodes and arcs tables for MinCostFlow.
+
+    The nodes are connected in a ring of uncapacitated arcs, so every instance
+    is feasible, and the remaining arcs join random pairs of nodes.  About a
+    quarter of the arcs have an upper bound.  The node imbalances are random,
+    with node 0 making up the difference so that they sum to zero."""
+    rng = numpy.random.RandomState(seed)
+    names = numpy.array(['N%d' % i for i in range(nodes)], dtype=object)
+
+    start = numpy.concatenate((numpy.arange(nodes), rng.randint(0, nodes, arcs - nodes)))
+    end = numpy.concatenate(((numpy.arange(nodes) + 1) % nodes, rng.randint(0, nodes, arcs - nodes)))
+    arc_data = pandas.DataFrame({'Start': names[start], 'End': names[end]})
+    arc_data = arc_data[start != end].drop_duplicates(['Start', 'End'])
+    n = len(arc_data)
+    arc_data['Cost'] = rng.randint(1, 100, n)
+    upper = numpy.where(rng.rand(n) < 0.25, 20, -1)
+    upper[:nodes] = -1
+    arc_data['UpperBound'] = upper
+    arc_data['LowerBound'] = -1
+
+    imbalance = rng.randint(-10, 11, nodes)
+    imbalance[0] -= imbalance.sum()
+    node_data = pandas.DataFrame({'Node': names, 'Imbalance': imbalance})
+    return node_data, arc_data
+
+def time_construction(nodes, arcs, directory):
+    """Write a generated network to directory and time MinCostFlow on it.
+
+    Returns the number of arcs, the time to build the Pyomo model, and the
+    times to build and to solve the scipy matrix form."""
+    node_data, arc_data = generate_network(nodes, arcs)
+    nodesfile = os.path.join(directory, 'nodes_%d.csv' % arcs)
+    arcsfile = os.path.join(directory, 'arcs_%d.csv' % arcs)
+    node_data.to_csv(nodesfile, index=False)
+    arc_data.to_csv(arcsfile, index=False)
+
+    start = time.time()
+    MinCostFlow(nodesfile, arcsfile)
+    pyomo_build = time.time() - start
+
+    start = time.time()
+    sp = MinCostFlow(nodesfile, arcsfile, backend='scipy')
+    scipy_build = time.time() - start
+    start = time.time()
+    sp.solve()
+    scipy_solve = time.time() - start
+    return len(arc_data), pyomo_build, scipy_build, scipy_solve
+
+def time_loading(nodes, arcs, directory):
+    """Write a generated arcs table in each file format and time reading it back.
+
+    Returns the number of arcs and a dictionary with the read time for each
+    format."""
+    node_data, arc_data = generate_network(nodes, arcs)
+    # An extra column that readTable should never load
+    arc_data['Comment'] = 'arc'
+
+    files = {}
+    files['csv'] = os.path.join(directory, 'arcs_%d.csv' % arcs)
+    arc_data.to_csv(files['csv'], index=False)
+    files['parquet'] = os.path.join(directory, 'arcs_%d.parquet' % arcs)
+    arc_data.to_parquet(files['parquet'], index=False)
+    files['feather'] = os.path.join(directory, 'arcs_%d.feather' % arcs)
+    # Uncompressed, so that the columns can be memory mapped without copying
+    arc_data.reset_index(drop=True).to_feather(files['feather'], compression='uncompressed')
+
+    times = {}
+    for fmt, filename in files.items():
+        start = time.time()
+        readTable(filename, ['Start', 'End', 'Cost', 'UpperBound', 'LowerBound'])
+        times[fmt] = time.time() - start
+    return len(arc_data), times
+
+if __name__ == '__main__':
+    # Usage: python benchmark.py [build|load] [nodes ...]
+    args = sys.argv[1:]
+    mode = args.pop(0) if args and args[0] in ('build', 'load') else 'build'
+    sizes = [int(n) for n in args] or [1000, 10000, 100000]
+    with tempfile.TemporaryDirectory() as directory:
+        if mode == 'build':
+            print('%10s %10s %14s %14s %14s' % ('Nodes', 'Arcs', 'Pyomo build', 'Scipy build', 'Scipy solve'))
+            for nodes in sizes:
+                times = time_construction(nodes, 10 * nodes, directory)
+                print('%10d %10d %14.3f %14.3f %14.3f' % ((nodes,) + times))
+        else:
+            print('%10s %10s %14s %14s %14s' % ('Nodes', 'Arcs', 'CSV read', 'Parquet read', 'Feather read'))
+            for nodes in sizes:
+                arcs, times = time_loading(nodes, 10 * nodes, directory)
+                print('%10d %10d %14.3f %14.3f %14.3f' % (nodes, arcs, times['csv'], times['parquet'], times['feather']))
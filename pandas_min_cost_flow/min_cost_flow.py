@@ -10,15 +10,106 @@
 #  ___________________________________________________________________________
 
 
+import os
+import logging
+import collections
+import numpy
 import pyomo
 import pandas
 import pyomo.opt
 import pyomo.environ as pe
 
-class MinCostFlow:
-    """This class implements a standard min-cost-flow model.  
-    
-    It takes as input two csv files, providing data for the nodes and the arcs of the network.  The nodes file should have columns:
+def readTable(filename, columns):
+    """Read the given columns of a CSV, Parquet, Feather or Arrow file into a DataFrame.
+
+    Parquet, Feather and Arrow IPC files are opened as memory maps through
+    pyarrow, and only the requested columns are read.  Numeric columns without
+    missing values that are stored in a single chunk (e.g., an uncompressed
+    Feather file written as one record batch) are converted without copying;
+    columns in several chunks are joined into one array.  Files with any other
+    extension are read as CSV."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in ('.parquet', '.pq'):
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(filename, columns=columns, memory_map=True)
+    elif ext in ('.feather', '.arrow', '.ipc'):
+        import pyarrow.feather
+        table = pyarrow.feather.read_table(filename, columns=columns, memory_map=True)
+    else:
+        return pandas.read_csv(filename, usecols=columns)
+    return table.to_pandas(split_blocks=True)
+
+def indexTable(data, keys):
+    """Index a DataFrame by the given key columns, sorting it only if it is not sorted already.
+
+    With pandas copy-on-write (the default from pandas 3) neither step copies the
+    other columns of a sorted table, so the columns that readTable did not copy
+    are still not copied.  An unsorted table is copied in sorted order."""
+    data = data.set_index(keys)
+    if not data.index.is_monotonic_increasing:
+        data = data.sort_index()
+    return data
+
+def readPeriods(filename, chunksize=100000):
+    """Read per-period node imbalances from a CSV, Parquet, Feather or Arrow file.
+
+    The file should have columns Period, Node, Imbalance, sorted by Period,
+    with consecutive integer periods.  This is a generator, yielding a dictionary
+    from node to imbalance for each period in turn.  CSV and Parquet files are
+    read chunksize rows at a time, so the whole file is never held in memory.
+    Nodes missing from a period have no imbalance."""
+    columns = ['Period', 'Node', 'Imbalance']
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in ('.parquet', '.pq'):
+        import pyarrow.parquet
+        chunks = (batch.to_pandas() for batch in
+                  pyarrow.parquet.ParquetFile(filename, memory_map=True).iter_batches(chunksize, columns=columns))
+    elif ext in ('.feather', '.arrow', '.ipc'):
+        chunks = [readTable(filename, columns)]
+    else:
+        chunks = pandas.read_csv(filename, usecols=columns, chunksize=chunksize)
+
+    period = None
+    current = {}
+    for chunk in chunks:
+        for p, n, b in zip(chunk['Period'].tolist(), chunk['Node'].tolist(), chunk['Imbalance'].tolist()):
+            if p != period:
+                if period is not None:
+                    if p < period:
+                        raise ValueError('%s is not sorted by Period' % filename)
+                    yield current
+                    # Periods without any rows have no imbalances
+                    for gap in range(period + 1, p):
+                        yield {}
+                period = p
+                current = {}
+            current[n] = b
+    if period is not None:
+        yield current
+
+def gurobiObject(opt, component):
+    """Return the gurobipy Var or Constr of a Pyomo variable or constraint in a Gurobi persistent solver, or None.
+
+    Pyomo's persistent interface cannot change a single objective coefficient or
+    right-hand side (set_var_attr and set_linear_constraint_attr refuse 'Obj' and
+    'RHS'), so this is the one place that reads the private maps of its Gurobi
+    interface.  None is returned for other solvers, or if the maps are missing,
+    and the caller then uses the public set_objective, remove_constraint and
+    add_constraint."""
+    if not hasattr(opt, 'set_gurobi_param'):
+        return None
+    if component.ctype is pe.Var:
+        solver_map = getattr(opt, '_pyomo_var_to_solver_var_map', None)
+    else:
+        solver_map = getattr(opt, '_pyomo_con_to_solver_con_map', None)
+    if solver_map is None:
+        return None
+    return solver_map.get(component)
+
+class Network:
+    """The data of a network, shared by the min-cost-flow models below.
+
+    It takes as input two files, providing data for the nodes and the arcs of the network.  The files can be CSV, Parquet, Feather or Arrow (see readTable).  The nodes file should have columns:
     
     Node, Imbalance
 
@@ -28,63 +119,134 @@ class MinCostFlow:
 
     that specify an arc start node, an arc end node, a cost for the arc, and upper and lower bounds for the flow."""
     def __init__(self, nodesfile, arcsfile):
-        """Read in the csv data."""
+        """Read in the network data."""
         # Read in the nodes file
-        self.node_data = pandas.read_csv('nodes.csv')
-        self.node_data.set_index(['Node'], inplace=True)
-        self.node_data.sort_index(inplace=True)
+        self.node_data = indexTable(readTable(nodesfile, ['Node', 'Imbalance']), ['Node'])
         # Read in the arcs file
-        self.arc_data = pandas.read_csv('arcs.csv')
-        self.arc_data.set_index(['Start','End'], inplace=True)
-        self.arc_data.sort_index(inplace=True)
+        self.arc_data = indexTable(readTable(arcsfile, ['Start', 'End', 'Cost', 'UpperBound', 'LowerBound']), ['Start','End'])
 
         self.node_set = self.node_data.index.unique()
         self.arc_set = self.arc_data.index.unique()
 
-        self.createModel()
+
+class MinCostFlow(Network):
+    """This class implements a standard min-cost-flow model.  
+    
+    The nodes and arcs files are read as described in Network.
+
+    With backend='pyomo' the problem is built as a Pyomo model, self.m.  With
+    backend='scipy' the node-arc incidence matrix is built directly as a
+    scipy.sparse CSR matrix, the arc bounds become variable bounds, and the LP is
+    solved in-process by HiGHS through scipy.optimize.linprog.  Either way,
+    solve() stores the arc flows in self.flow and the total cost in self.cost."""
+    def __init__(self, nodesfile, arcsfile, backend='pyomo'):
+        """Read in the network data."""
+        Network.__init__(self, nodesfile, arcsfile)
+
+        self.backend = backend
+        if backend == 'pyomo':
+            self.createModel()
+        elif backend == 'scipy':
+            self.createMatrix()
+        else:
+            raise ValueError("Unknown backend '%s'" % backend)
 
     def createModel(self):
-        """Create the pyomo model given the csv data."""
+        """Create the pyomo model given the network data.
+
+        The arc table is grouped by Start and End once, giving the successor and
+        predecessor arcs of every node as arrays of arc positions.  The cost,
+        bounds and imbalances are mutable parameters initialized from column
+        arrays, so no rule looks up the DataFrame and the data can be changed
+        later (see updateCosts, updateImbalances and updateBounds)."""
         self.m = pe.ConcreteModel()
 
+        arcs = list(self.arc_data.index)
+        preds = self.arc_data.groupby(level='End', sort=False).indices
+        succs = self.arc_data.groupby(level='Start', sort=False).indices
+
         # Create sets
         self.m.node_set = pe.Set( initialize=self.node_set )
-        self.m.arc_set = pe.Set( initialize=self.arc_set , dimen=2)
+        self.m.arc_set = pe.Set( initialize=arcs , dimen=2)
+
+        # Create parameters
+        def arc_values(column):
+            return dict(zip(arcs, self.arc_data[column].tolist()))
+        self.m.cost = pe.Param(self.m.arc_set, initialize=arc_values('Cost'), mutable=True)
+        self.m.upper = pe.Param(self.m.arc_set, initialize=arc_values('UpperBound'), mutable=True)
+        self.m.lower = pe.Param(self.m.arc_set, initialize=arc_values('LowerBound'), mutable=True)
+        self.m.imbalance = pe.Param(self.m.node_set, initialize=self.node_data['Imbalance'].to_dict(), mutable=True)
 
         # Create variables
         self.m.Y = pe.Var(self.m.arc_set, domain=pe.NonNegativeReals)
+        Y = [self.m.Y[e] for e in arcs]
 
         # Create objective
-        def obj_rule(m):
-            return sum(m.Y[e] * self.arc_data.ix[e,'Cost'] for e in self.arc_set)
-        self.m.OBJ = pe.Objective(rule=obj_rule, sense=pe.minimize)
-        
+        self.m.OBJ = pe.Objective(expr=pe.sum_product(self.m.cost, self.m.Y), sense=pe.minimize)
+
         # Flow Balance rule
         def flow_bal_rule(m, n):
-            arcs = self.arc_data.reset_index()
-            preds = arcs[ arcs.End == n ]['Start']
-            succs = arcs[ arcs.Start == n ]['End']
-            return sum(m.Y[(p,n)] for p in preds) - sum(m.Y[(n,s)] for s in succs) == self.node_data.ix[n,'Imbalance']
+            return sum(Y[k] for k in preds.get(n, ())) - sum(Y[k] for k in succs.get(n, ())) == m.imbalance[n]
         self.m.FlowBal = pe.Constraint(self.m.node_set, rule=flow_bal_rule)
 
         # Upper bounds rule
         def upper_bounds_rule(m, n1, n2):
             e = (n1,n2)
-            if self.arc_data.ix[e, 'UpperBound'] < 0:
+            if m.upper[e].value < 0:
                 return pe.Constraint.Skip
-            return m.Y[e] <= self.arc_data.ix[e, 'UpperBound']
+            return m.Y[e] <= m.upper[e]
         self.m.UpperBound = pe.Constraint(self.m.arc_set, rule=upper_bounds_rule)
-        
+
         # Lower bounds rule
         def lower_bounds_rule(m, n1, n2):
             e = (n1,n2)
-            if self.arc_data.ix[e, 'LowerBound'] < 0:
+            if m.lower[e].value < 0:
                 return pe.Constraint.Skip
-            return m.Y[e] >= self.arc_data.ix[e, 'LowerBound']
+            return m.Y[e] >= m.lower[e]
         self.m.LowerBound = pe.Constraint(self.m.arc_set, rule=lower_bounds_rule)
 
+        # Changes since the last resolve(), see resolve()
+        self.persistent = None
+        self.changed_costs = set()
+        self.changed_rows = {}
+
+    def createMatrix(self):
+        """Create the LP in matrix form given the network data.
+
+        Row n of the CSR matrix self.A has +1 for the arcs that end at node n and
+        -1 for the arcs that start at it, so A * Y == Imbalance is the flow balance.
+        Negative UpperBound and LowerBound values mean the arc has no such bound."""
+        import scipy.sparse
+        import scipy.sparse.csgraph
+
+        start = self.node_set.get_indexer(self.arc_data.index.get_level_values('Start'))
+        end = self.node_set.get_indexer(self.arc_data.index.get_level_values('End'))
+        if (start < 0).any() or (end < 0).any():
+            raise ValueError('Every arc must start and end at a node in the nodes file')
+
+        narcs = len(self.arc_data)
+        cols = numpy.arange(narcs)
+        self.A = scipy.sparse.csr_matrix(
+            (numpy.concatenate((numpy.ones(narcs), -numpy.ones(narcs))),
+             (numpy.concatenate((end, start)), numpy.concatenate((cols, cols)))),
+            shape=(len(self.node_set), narcs))
+        self.b = self.node_data['Imbalance'].to_numpy(dtype=float)
+        self.c = self.arc_data['Cost'].to_numpy(dtype=float)
+
+        upper = self.arc_data['UpperBound'].to_numpy(dtype=float)
+        lower = self.arc_data['LowerBound'].to_numpy(dtype=float)
+        self.bounds = numpy.column_stack((numpy.maximum(lower, 0), numpy.where(upper < 0, numpy.inf, upper)))
+
+        # The flow balance rows of each connected component sum to zero
+        nnodes = len(self.node_set)
+        adjacency = scipy.sparse.csr_matrix((numpy.ones(narcs), (start, end)), shape=(nnodes, nnodes))
+        _, self.component = scipy.sparse.csgraph.connected_components(adjacency, directed=True, connection='weak')
+
     def solve(self):
         """Solve the model."""
+        if self.backend == 'scipy':
+            return self.solveMatrix()
+
         solver = pyomo.opt.SolverFactory('gurobi')
         results = solver.solve(self.m, tee=True, keepfiles=False, options_string="mip_tolerances_integrality=1e-9 mip_tolerances_mipgap=0")
 
@@ -93,9 +255,312 @@ class MinCostFlow:
         if (results.solver.termination_condition != pyomo.opt.TerminationCondition.optimal):  
             logging.warning('Check solver optimality?') 
 
+        self.storeFlows()
+
+    def storeFlows(self):
+        """Store the flows and the cost of the Pyomo model's solution."""
+        self.flow = pandas.Series([self.m.Y[e].value for e in self.arc_data.index], index=self.arc_data.index, name='Y')
+        self.cost = pe.value(self.m.OBJ)
+
+    def solveMatrix(self, method='highs-ipm'):
+        """Solve the matrix form of the model with HiGHS, in-process.
+
+        The interior point method with crossover is the default, since it
+        returns a basic solution and is much faster than the simplex methods on
+        large networks."""
+        import scipy.optimize
+
+        # HiGHS presolve is very slow to find the redundant flow balance rows,
+        # so drop the first row of each component whose imbalances sum to zero
+        _, first = numpy.unique(self.component, return_index=True)
+        balanced = numpy.abs(numpy.bincount(self.component, weights=self.b)) < 1e-9
+        rows = numpy.ones(len(self.b), dtype=bool)
+        rows[first[balanced]] = False
+
+        results = scipy.optimize.linprog(self.c, A_eq=self.A[rows], b_eq=self.b[rows], bounds=self.bounds, method=method)
+        if results.status != 0:
+            logging.warning('Check solver optimality? %s' % results.message)
+            self.flow = None
+            self.cost = None
+            return
+
+        self.flow = pandas.Series(results.x, index=self.arc_data.index, name='Y')
+        self.cost = results.fun
+
+    def arcPositions(self, arcs):
+        """Return the positions in arc_data of the given (Start, End) arcs."""
+        positions = self.arc_data.index.get_indexer(list(arcs))
+        if (positions < 0).any():
+            raise KeyError('Unknown arcs: %s' % [e for e, k in zip(arcs, positions) if k < 0])
+        return positions
+
+    def changeRow(self, con):
+        """Record that con has changed since the last resolve(), remembering whether the solver has it."""
+        if self.persistent is not None and con not in self.changed_rows:
+            self.changed_rows[con] = con.active
+
+    def updateCosts(self, costs):
+        """Change the Cost of some arcs.
+
+        costs maps (Start, End) arcs to their new cost, e.g., a dict or a Series.
+        The change is sent to the solver by the next resolve()."""
+        costs = dict(costs)
+        if self.backend == 'scipy':
+            self.c[self.arcPositions(costs.keys())] = list(costs.values())
+            return
+        for e, c in costs.items():
+            self.m.cost[e] = c
+            self.changed_costs.add(e)
+
+    def updateImbalances(self, imbalances):
+        """Change the Imbalance of some nodes.
+
+        imbalances maps nodes to their new imbalance.  The change is sent to the
+        solver by the next resolve()."""
+        imbalances = dict(imbalances)
+        if self.backend == 'scipy':
+            positions = self.node_set.get_indexer(list(imbalances.keys()))
+            if (positions < 0).any():
+                raise KeyError('Unknown nodes: %s' % [n for n, k in zip(imbalances.keys(), positions) if k < 0])
+            self.b[positions] = list(imbalances.values())
+            return
+        for n, b in imbalances.items():
+            self.m.imbalance[n] = b
+            self.changeRow(self.m.FlowBal[n])
+
+    def updateBounds(self, upper=None, lower=None):
+        """Change the UpperBound and/or LowerBound of some arcs.
+
+        upper and lower map (Start, End) arcs to their new bounds.  As in the arcs
+        file, a negative value means that the arc has no such bound.  The change
+        is sent to the solver by the next resolve()."""
+        upper = dict(upper) if upper is not None else {}
+        lower = dict(lower) if lower is not None else {}
+        if self.backend == 'scipy':
+            if upper:
+                values = numpy.array(list(upper.values()), dtype=float)
+                self.bounds[self.arcPositions(upper.keys()), 1] = numpy.where(values < 0, numpy.inf, values)
+            if lower:
+                values = numpy.array(list(lower.values()), dtype=float)
+                self.bounds[self.arcPositions(lower.keys()), 0] = numpy.maximum(values, 0)
+            return
+        for bounds, param, rows, sense in ((upper, self.m.upper, self.m.UpperBound, 'upper'),
+                                           (lower, self.m.lower, self.m.LowerBound, 'lower')):
+            for e, value in bounds.items():
+                param[e] = value
+                if e in rows:
+                    con = rows[e]
+                    self.changeRow(con)
+                    if value < 0:
+                        con.deactivate()
+                    else:
+                        con.activate()
+                elif value >= 0:
+                    # A new bound for this arc, so it needs a row
+                    rows[e] = (self.m.Y[e] <= param[e]) if sense == 'upper' else (self.m.Y[e] >= param[e])
+                    if self.persistent is not None:
+                        self.changed_rows.setdefault(rows[e], False)
+
+    def resolve(self, solver='gurobi_persistent'):
+        """Solve the model again after updateCosts, updateImbalances or updateBounds.
+
+        The first call loads the Pyomo model into a persistent solver.  Later
+        calls only send the changed objective coefficients, right-hand sides and
+        bound rows, so the solver starts from its previous basis and the work
+        done before the solve is proportional to the size of the change.  With
+        the scipy backend the matrix form is simply solved again."""
+        if self.backend == 'scipy':
+            return self.solveMatrix()
+
+        opt = self.persistent
+        if opt is None:
+            opt = self.persistent = pyomo.opt.SolverFactory(solver)
+            opt.set_instance(self.m)
+        else:
+            # Gurobi can change single coefficients and right-hand sides in place
+            # (see gurobiObject).  Otherwise the objective, and the rows that
+            # changed, are sent again.
+            if self.changed_costs:
+                Y = [(gurobiObject(opt, self.m.Y[e]), e) for e in self.changed_costs]
+                if all(var is not None for var, e in Y):
+                    for var, e in Y:
+                        var.Obj = self.m.cost[e].value
+                else:
+                    opt.set_objective(self.m.OBJ)
+            for con, in_solver in self.changed_rows.items():
+                if in_solver and con.active:
+                    row = gurobiObject(opt, con)
+                    if row is not None:
+                        rhs = con.upper if con.has_ub() else con.lower
+                        row.RHS = pe.value(rhs)
+                        continue
+                if in_solver:
+                    opt.remove_constraint(con)
+                if con.active:
+                    opt.add_constraint(con)
+        self.changed_costs = set()
+        self.changed_rows = {}
+
+        results = opt.solve(tee=False)
+        if (results.solver.termination_condition != pyomo.opt.TerminationCondition.optimal):
+            logging.warning('Check solver optimality?')
+        self.storeFlows()
+
+
+class RollingHorizonMinCostFlow(Network):
+    """A time-expanded min-cost-flow model, solved with a rolling horizon.
+
+    The network in the nodes and arcs files is repeated in every period, with the
+    same costs and bounds.  The node imbalances change from period to period (see
+    readPeriods), and the Imbalance column of the nodes file is not used.  The
+    holdover file has columns:
+
+    Node, Cost, UpperBound
+
+    that specify the nodes that can hold flow from one period to the next, the
+    cost per unit held for a period, and the most flow that can be held (or a
+    negative value for no limit).
+
+    The Pyomo model only holds a window of periods.  solve() solves the window,
+    commits its first periods, and moves the window forward by changing the
+    imbalances and starting inventory, which are mutable parameters.  The model is
+    never rebuilt, so memory does not grow with the length of the horizon.  The
+    flows of committed periods are final: they leave the window, and what they
+    hold over becomes the fixed starting inventory of the next window."""
+    def __init__(self, nodesfile, arcsfile, holdoverfile, window=4, commit=1, solver='gurobi'):
+        """Read in the network data.  The window has window periods, and each solve commits commit of them."""
+        if not 1 <= commit <= window:
+            raise ValueError('commit must be between 1 and the window size')
+        self.window = window
+        self.commit = commit
+        self.solver = solver
+
+        # Read in the holdover file
+        self.holdover_data = indexTable(readTable(holdoverfile, ['Node', 'Cost', 'UpperBound']), ['Node'])
+
+        Network.__init__(self, nodesfile, arcsfile)
+        self.createModel()
+
+    def createModel(self):
+        """Create the pyomo model for one window of periods."""
+        self.m = pe.ConcreteModel()
+
+        arcs = list(self.arc_data.index)
+        preds = self.arc_data.groupby(level='End', sort=False).indices
+        succs = self.arc_data.groupby(level='Start', sort=False).indices
+        cost = self.arc_data['Cost'].tolist()
+        upper = self.arc_data['UpperBound'].tolist()
+        lower = self.arc_data['LowerBound'].tolist()
+        position = dict((e, k) for k, e in enumerate(arcs))
+        hold_cost = self.holdover_data['Cost'].to_dict()
+        hold_upper = self.holdover_data['UpperBound'].to_dict()
+
+        # Create sets; periods are numbered from the start of the window
+        self.m.node_set = pe.Set( initialize=self.node_set )
+        self.m.arc_set = pe.Set( initialize=arcs , dimen=2)
+        self.m.hold_set = pe.Set( initialize=self.holdover_data.index, within=self.m.node_set )
+        self.m.period_set = pe.RangeSet(0, self.window - 1)
+
+        # Create parameters, which change as the window moves
+        self.m.imbalance = pe.Param(self.m.node_set, self.m.period_set, initialize=0, mutable=True)
+        self.m.initial = pe.Param(self.m.hold_set, initialize=0, mutable=True)
+
+        # Create variables, with the arc and holdover bounds as variable bounds
+        def flow_bounds(m, n1, n2, t):
+            k = position[n1,n2]
+            return (max(lower[k], 0), upper[k] if upper[k] >= 0 else None)
+        self.m.Y = pe.Var(self.m.arc_set, self.m.period_set, domain=pe.NonNegativeReals, bounds=flow_bounds)
+        def hold_bounds(m, n, t):
+            return (0, hold_upper[n] if hold_upper[n] >= 0 else None)
+        self.m.H = pe.Var(self.m.hold_set, self.m.period_set, domain=pe.NonNegativeReals, bounds=hold_bounds)
+
+        # Create objective
+        def obj_rule(m):
+            return sum(c * m.Y[e,t] for e, c in zip(arcs, cost) for t in m.period_set) + \
+                   sum(hold_cost[n] * m.H[n,t] for n in m.hold_set for t in m.period_set)
+        self.m.OBJ = pe.Objective(rule=obj_rule, sense=pe.minimize)
+
+        # Flow Balance rule, where flow held over counts as flow in and out of the node
+        def flow_bal_rule(m, n, t):
+            flow = sum(m.Y[arcs[k],t] for k in preds.get(n, ())) - sum(m.Y[arcs[k],t] for k in succs.get(n, ()))
+            if n in m.hold_set:
+                flow += (m.initial[n] if t == 0 else m.H[n,t-1]) - m.H[n,t]
+            return flow == m.imbalance[n,t]
+        self.m.FlowBal = pe.Constraint(self.m.node_set, self.m.period_set, rule=flow_bal_rule)
+
+    def solve(self, periods):
+        """Solve the time-expanded model over the given periods with a rolling horizon.
+
+        periods is an iterable with a mapping from nodes to imbalances for each
+        period, such as readPeriods(filename).  It is read as the window moves, so
+        it can be a generator over a very long horizon.  This is a generator too,
+        yielding (period, flows, held) for each committed period, where flows is a
+        Series indexed like arc_data and held is a Series with the flow held over
+        at each holdover node.  self.cost is the total cost of the committed
+        periods so far."""
+        solver = pyomo.opt.SolverFactory(self.solver)
+        m = self.m
+        periods = iter(periods)
+        window = collections.deque()
+        first = 0
+        self.cost = 0.0
+        for n in m.hold_set:
+            m.initial[n] = 0
+
+        while True:
+            # Fill the window with the next periods
+            while len(window) < self.window:
+                try:
+                    window.append(next(periods))
+                except StopIteration:
+                    break
+            if not window:
+                return
+
+            # Move the window; the periods past the end of the horizon have no imbalances
+            for t in m.period_set:
+                imbalances = window[t] if t < len(window) else {}
+                for n in m.node_set:
+                    m.imbalance[n,t] = imbalances.get(n, 0)
+
+            results = solver.solve(m, tee=False)
+            if (results.solver.termination_condition != pyomo.opt.TerminationCondition.optimal):
+                logging.warning('Check solver optimality in the window starting at period %d?' % first)
+
+            # Commit the first periods, and hold their decisions fixed from now on
+            commit = min(self.commit, len(window))
+            for t in range(commit):
+                flows = pandas.Series([m.Y[e,t].value for e in self.arc_data.index], index=self.arc_data.index, name='Y')
+                held = pandas.Series([m.H[n,t].value for n in m.hold_set], index=self.holdover_data.index, name='H')
+                self.cost += float((flows * self.arc_data['Cost']).sum() + (held * self.holdover_data['Cost']).sum())
+                yield first + t, flows, held
+            for n in m.hold_set:
+                m.initial[n] = m.H[n,commit-1].value
+            for t in range(commit):
+                window.popleft()
+            first += commit
+
 
 if __name__ == '__main__':
        sp = MinCostFlow('nodes.csv', 'arcs.csv') 
        sp.solve()
        print('\n\n---------------------------')
-       print('Cost: ', sp.m.OBJ())
+       print('Cost: ', sp.cost)
+
+       # The same problem as a sparse matrix, solved in-process by HiGHS
+       sp = MinCostFlow('nodes.csv', 'arcs.csv', backend='scipy')
+       sp.solve()
+       print('Cost (scipy backend): ', sp.cost)
+
+       # Make the direct arc cheaper and re-solve from the previous basis
+       sp = MinCostFlow('nodes.csv', 'arcs.csv')
+       sp.resolve()
+       sp.updateCosts({('A','E'): 2})
+       sp.resolve()
+       print('Cost after update: ', sp.cost)
+
+       # Solve six periods with a rolling horizon, holding flow over at A and E
+       rh = RollingHorizonMinCostFlow('nodes.csv', 'arcs.csv', 'holdover.csv', window=3)
+       for period, flows, held in rh.solve(readPeriods('periods.csv')):
+           print('Period %d: flows %s, held %s' % (period, flows[flows > 0].to_dict(), held[held > 0].to_dict()))
+       print('Rolling horizon cost: ', rh.cost)
@@ -10,53 +10,252 @@
 #  ___________________________________________________________________________
 
 
+import time
 import pyomo
 import pyomo.opt
 import pyomo.environ as pe
+import numpy
 import pandas
 import networkx
+from pyomo.common.collections import ComponentSet
+
+class CutPool:
+    """A pool of subtour elimination constraints stored in a ConstraintList.
+
+    Each cut is identified by the set of nodes in its connected component, so the
+    same component is never added twice.  After every solve the slack of each
+    active cut is checked, and cuts that have not been binding for max_age solves
+    are deactivated.  A deactivated cut is reactivated when the current answer
+    violates it again.  When more than max_size cuts are stored, the deactivated
+    cuts that have been idle the longest are deleted from the model, then the
+    active cuts with the most slack in the current answer (see trim).  A deleted
+    cut is added again, as a new cut, if a later answer violates it; an active
+    cut that comes back within max_size additions of being deleted is not
+    deleted again until max_size more cuts have been added, so the row
+    generation does not keep deleting and adding the same cuts."""
+
+    def __init__(self, constraints, rule, max_age=10, max_size=10000, tol=1e-6):
+        """constraints is the ConstraintList holding the cuts, and rule(nodes) returns the cut for a set of nodes."""
+        self.constraints = constraints
+        self.rule = rule
+        self.max_age = max_age
+        self.max_size = max_size
+        self.tol = tol
+        # Map from the frozenset of nodes to [constraint index, solves since binding]
+        self.cuts = {}
+        # Cuts deleted while active, and those of them that were added again,
+        # mapped to the value of added at the time; both only hold the cuts
+        # of the last max_size additions
+        self.evicted = {}
+        self.returned = {}
+        self.added = 0
+        self.duplicates = 0
+        self.deactivated = 0
+        self.reactivated = 0
+        self.deleted = 0
+
+    def __len__(self):
+        return len(self.cuts)
+
+    def numActive(self):
+        """Return the number of cuts that are active in the model."""
+        return sum(1 for i, age in self.cuts.values() if self.constraints[i].active)
+
+    def get(self, nodes):
+        """Return the constraint for nodes, or None if it is not in the pool."""
+        cut = self.cuts.get(frozenset(nodes))
+        if cut is None:
+            return None
+        return self.constraints[cut[0]]
+
+    def add(self, nodes):
+        """Add the cut for nodes, or reactivate it if it is already in the pool.
+
+        Returns the constraint, or None if an active copy of the cut exists."""
+        key = frozenset(nodes)
+        if key in self.cuts:
+            cut = self.cuts[key]
+            con = self.constraints[cut[0]]
+            if con.active:
+                self.duplicates += 1
+                return None
+            con.activate()
+            cut[1] = 0
+            self.reactivated += 1
+            return con
+
+        if key in self.evicted:
+            del self.evicted[key]
+            self.returned[key] = self.added
+        con = self.constraints.add( self.rule(key) )
+        self.cuts[key] = [con.index(), 0]
+        self.added += 1
+        self.trim(keep=key)
+        return con
+
+    def update(self):
+        """Age the cuts using the current answer.
+
+        Active cuts with slack get older and are deactivated once they reach
+        max_age.  Deactivated cuts that are violated are reactivated.  Returns the
+        number of reactivated cuts."""
+        reactivated = 0
+        for cut in self.cuts.values():
+            con = self.constraints[cut[0]]
+            slack = con.uslack()
+            if con.active:
+                if slack > self.tol:
+                    cut[1] += 1
+                    if self.max_age is not None and cut[1] >= self.max_age:
+                        con.deactivate()
+                        self.deactivated += 1
+                else:
+                    cut[1] = 0
+            elif slack < -self.tol:
+                con.activate()
+                cut[1] = 0
+                reactivated += 1
+            else:
+                cut[1] += 1
+        self.reactivated += reactivated
+        return reactivated
+
+    def trim(self, keep=None):
+        """Delete cuts until the pool holds at most max_size cuts.
+
+        Deactivated cuts go first, the longest idle ones before the others, and
+        then active cuts with slack in the current answer, the ones with the most
+        slack first.  Cuts that are binding or violated, including the cut for the
+        frozenset keep that was just added, are never deleted, nor are active cuts
+        that came back after being deleted, until max_size more cuts have been
+        added.  So the pool only exceeds max_size by cuts that are needed by the
+        current answer or that came back recently, at most max_size of them."""
+        if self.max_size is None or len(self.cuts) <= self.max_size:
+            return
+        for recent in (self.evicted, self.returned):
+            for key in [key for key, added in recent.items() if self.added - added >= self.max_size]:
+                del recent[key]
+        excess = len(self.cuts) - self.max_size
+        candidates = []
+        for key, (i, age) in self.cuts.items():
+            con = self.constraints[i]
+            if not con.active:
+                candidates.append(((0, -age), key))
+            elif key != keep and key not in self.returned:
+                # Before the first solve there is no answer, and no slack
+                body = pe.value(con.body, exception=False)
+                slack = pe.value(con.upper) - body if body is not None else 0
+                if slack > self.tol:
+                    candidates.append(((1, -slack, -age), key))
+        candidates.sort(key=lambda t: t[0])
+        for rank, key in candidates[:excess]:
+            if rank[0] == 1:
+                self.evicted[key] = self.added
+            del self.constraints[self.cuts.pop(key)[0]]
+            self.deleted += 1
+
+
+def readEdgeList(nfile, chunksize=1000000):
+    """Read a CSV edge list with columns startNode, destNode and dist.
+
+    The file is read in chunks of chunksize rows.  Node labels are mapped to dense
+    integer IDs in the order they are first seen.  Returns the array of node
+    labels (indexed by ID), an (E, 2) integer array with the endpoints of each
+    edge, and a float array with the edge weights.  Repeated edges keep the first
+    weight given in the file.  A row without a startNode or destNode raises a
+    ValueError."""
+    labels = {}
+    ends = []
+    dists = []
+    reader = pandas.read_csv(nfile, usecols=['startNode', 'destNode', 'dist'],
+                             dtype={'startNode': str, 'destNode': str, 'dist': numpy.float64},
+                             chunksize=chunksize)
+    for chunk in reader:
+        missing = chunk.startNode.isna() | chunk.destNode.isna()
+        if missing.any():
+            # Line numbers count the header line
+            raise ValueError('Missing startNode or destNode on line %d of %s' % (chunk.index[missing.to_numpy()][0] + 2, nfile))
+        # Factorize the chunk's labels, then map its distinct labels to global IDs
+        codes, uniques = pandas.factorize(pandas.concat([chunk.startNode, chunk.destNode], ignore_index=True))
+        ids = numpy.fromiter((labels.setdefault(label, len(labels)) for label in uniques),
+                             dtype=numpy.int64, count=len(uniques))
+        ends.append(ids[codes].reshape(2, -1).T)
+        dists.append(chunk.dist.to_numpy(dtype=numpy.float64))
+
+    if ends:
+        edges = numpy.ascontiguousarray(numpy.concatenate(ends))
+        dist = numpy.concatenate(dists)
+    else:
+        edges = numpy.empty((0, 2), dtype=numpy.int64)
+        dist = numpy.empty(0, dtype=numpy.float64)
+
+    # Drop repeated edges, keeping the file order
+    key = edges[:,0] * max(len(labels), 1) + edges[:,1]
+    _, first = numpy.unique(key, return_index=True)
+    if len(first) < len(key):
+        first.sort()
+        edges = edges[first]
+        dist = dist[first]
+
+    return numpy.array(list(labels), dtype=object), edges, dist
+
 
 class MSTRowGeneration:
     """A class to find Minimum Spanning Tree using a row-generation algorithm."""
 
-    def __init__(self, nfile):
-        """The input is a CSV file describing the undirected network's edges."""
-        self.df = pandas.read_csv(nfile)
+    def __init__(self, nfile, solver='gurobi', max_age=10, max_size=10000, chunksize=1000000):
+        """The input is a CSV file describing the undirected network's edges.
+
+        The edge list is read with readEdgeList, so nodes are numbered 0, 1, ...
+        in the model and node_labels maps the numbers back to the file's labels.
+        The solver is used for every solve.  The lazy-constraint mode uses the
+        persistent interface of the same solver (e.g., gurobi_persistent).
+        max_age and max_size configure the pool of subtour elimination
+        constraints (see CutPool)."""
+        self.node_labels, self.edges, self.dist = readEdgeList(nfile, chunksize=chunksize)
+        self.solver = solver
+        self.max_age = max_age
+        self.max_size = max_size
+        self.stats = {}
 
         self.createRelaxedModel()
 
     def createRelaxedModel(self):
         """Create the relaxed model, without any subtour elimination constraints."""
-        df = self.df
-        node_set = set( list( df.startNode ) + list(df.destNode) )
-
         # Create the model and sets
         m = pe.ConcreteModel()
 
-        df.set_index(['startNode','destNode'], inplace=True)
-        edge_set = df.index.unique()
-
+        edge_set = [tuple(e) for e in self.edges.tolist()]
         m.edge_set = pe.Set(initialize=edge_set, dimen=2)
-        m.node_set = pe.Set(initialize=node_set)
-    
+        m.node_set = pe.RangeSet(0, len(self.node_labels) - 1)
+
+        # Edge weights are mutable, so that the objective can be updated in place
+        m.dist = pe.Param(m.edge_set, initialize=dict(zip(edge_set, self.dist.tolist())), mutable=True)
+
         # Define variables
         m.Y = pe.Var(m.edge_set, domain=pe.Binary)
 
         # Objective
-        def obj_rule(m):
-            return sum( m.Y[e] * df.ix[e,'dist'] for e in m.edge_set)
-        m.OBJ = pe.Objective(rule=obj_rule, sense=pe.minimize)
+        m.OBJ = pe.Objective(expr=pe.sum_product(m.dist, m.Y), sense=pe.minimize)
 
         # Add the n-1 constraint
         def simple_const_rule(m):
-            return sum( m.Y[e] for e in m.edge_set ) == len(node_set) - 1
+            return pe.summation(m.Y) == len(m.node_set) - 1
         m.simpleConst = pe.Constraint(rule = simple_const_rule)
-       
+
         # Empty constraint list for subtour elimination constraints
         # This is where the generated rows will go
         m.ccConstraints = pe.ConstraintList()
 
         self.m = m
+        self.pool = CutPool(m.ccConstraints, self.createConstForCC, max_age=self.max_age, max_size=self.max_size)
+        # The persistent solver and the cuts it has, see getPersistentSolver
+        self.persistent = None
+        self.in_solver = ComponentSet()
+
+    def labelEdges(self, edges):
+        """Convert edges between node IDs into edges between node labels."""
+        return [(self.node_labels[i], self.node_labels[j]) for i, j in edges]
 
     def convertYsToNetworkx(self):
         """Convert the model's Y variables into a networkx object."""
@@ -65,34 +264,219 @@ class MSTRowGeneration:
         ans.add_edges_from(edges)
         return ans
 
-    def solve(self):
-        """Solve for the MST, using row generation for subtour elimination constraints."""
-        def createConstForCC(m, cc):
-            cc = dict.fromkeys(cc)
-            return sum( m.Y[e] for e in m.edge_set if ((e[0] in cc) and (e[1] in cc))) <= len(cc) - 1
-        
-        if not hasattr(self, 'solver'):
-            solver = pyomo.opt.SolverFactory('gurobi')
-
-        done = False
-        while not done:
+    def createConstForCC(self, cc):
+        """Create the subtour elimination constraint for the nodes in cc."""
+        m = self.m
+        nodes = numpy.fromiter(cc, dtype=self.edges.dtype, count=len(cc))
+        inside = numpy.isin(self.edges, nodes).all(axis=1)
+        return sum( m.Y[e] for e in map(tuple, self.edges[inside].tolist()) ) <= len(cc) - 1
+
+    def findSubtours(self):
+        """Return the connected components of the current answer, or an empty list if it spans the network."""
+        graph = self.convertYsToNetworkx()
+        ccs = list(networkx.connected_components(graph))
+        if len(ccs) == 1 and len(ccs[0]) == len(self.m.node_set):
+            return []
+        return ccs
+
+    def solve(self, mode='iterative', persistent=False):
+        """Solve for the MST, using row generation for subtour elimination constraints.
+
+        With mode='iterative' the relaxed model is re-solved after each round of
+        subtour elimination constraints.  With persistent=True these solves use
+        the persistent interface of the solver, if it has one (see
+        getPersistentSolver).  With mode='lazy' a single branch-and-bound is run
+        by the persistent solver, and a lazy-constraint callback adds the subtour
+        elimination constraint for every integer solution that is not a spanning
+        tree.  Lazy mode falls back to the iterative loop if the solver has no
+        callback support.
+
+        Returns a dictionary with the mode used, the number of solves, the number
+        of subtour elimination constraints added and the total time.  The numbers
+        of cuts deactivated, reactivated and deleted are also for this solve
+        only, while pool and active are the sizes of the pool after it."""
+        start = time.time()
+        totals = (self.pool.deactivated, self.pool.reactivated, self.pool.deleted)
+        if mode == 'lazy':
+            solver = self.getCallbackSolver()
+            if solver is None:
+                print('Solver %s does not support lazy constraints, using the iterative mode' % self.solver)
+                mode = 'iterative'
+        elif mode != 'iterative':
+            raise ValueError("Unknown solve mode '%s'" % mode)
+
+        if mode == 'lazy':
+            iterations, cuts = self.solveLazy(solver)
+        else:
+            iterations, cuts = self.solveIterative(self.getPersistentSolver() if persistent else None)
+
+        self.stats = {'mode': mode, 'iterations': iterations, 'cuts': cuts, 'time': time.time() - start,
+                      'pool': len(self.pool), 'active': self.pool.numActive(),
+                      'deactivated': self.pool.deactivated - totals[0],
+                      'reactivated': self.pool.reactivated - totals[1],
+                      'deleted': self.pool.deleted - totals[2]}
+        return self.stats
+
+    def solveIterative(self, solver=None):
+        """Re-solve the model, adding subtour elimination constraints, until the answer is a tree.
+
+        solver is a persistent solver from getPersistentSolver, or None to write
+        the whole model for every solve with the solver named in the constructor."""
+        if solver is None:
+            opt = pyomo.opt.SolverFactory(self.solver)
+        elif hasattr(solver, 'set_callback'):
+            # The callback of an earlier lazy solve is not needed here
+            solver.set_callback(None)
+
+        iterations = 0
+        cuts = 0
+        while True:
             # Solve once and add subtour elimination constraints if necessary
             # Finish when there are no more subtours
-            results = solver.solve(self.m, tee=False, keepfiles=False, options_string="mip_tolerances_integrality=1e-9 mip_tolerances_mipgap=0")
+            if solver is None:
+                opt.solve(self.m, tee=False, keepfiles=False, options_string="mip_tolerances_integrality=1e-9 mip_tolerances_mipgap=0")
+            else:
+                self.updateSolver(solver)
+                solver.solve(tee=False)
+            iterations += 1
             # Construct a graph from the answer, and look for subtours
-            graph = self.convertYsToNetworkx()
-            ccs = list(networkx.connected_component_subgraphs(graph))
+            ccs = self.findSubtours()
+            if not ccs:
+                break
+            # Age the pool, and bring back any deactivated cut that is violated
+            self.pool.update()
             for cc in ccs:
+                con = self.pool.add(cc)
+                if con is None:
+                    continue
                 print('Adding constraint for connected component:')
-                print(cc.nodes())
-                print(createConstForCC(self.m, cc))
+                print([self.node_labels[i] for i in cc])
+                print(con.expr)
                 print('--------------\n')
-                self.m.ccConstraints.add( createConstForCC(self.m, cc) )
-            if ccs[0].number_of_nodes() == len(self.m.node_set):
-                done = True
+                cuts += 1
+        return iterations, cuts
+
+    def getPersistentSolver(self):
+        """Return the persistent interface of the solver, loaded with the model, or None if there is none.
+
+        The solver is created and given the model on the first call, and the same
+        solver is returned after that.  updateSolver sends it the changes that
+        later solves need: the objective and the cuts in the pool."""
+        if self.persistent is None:
+            name = self.solver
+            if not name.endswith('_persistent'):
+                name += '_persistent'
+            if name not in pyomo.opt.SolverFactory:
+                return None
+            solver = pyomo.opt.SolverFactory(name)
+            if not solver.available(exception_flag=False):
+                return None
+            solver.set_instance(self.m)
+            if hasattr(solver, 'set_gurobi_param'):
+                solver.set_gurobi_param('MIPGap', 0)
+            self.persistent = solver
+            self.in_solver = ComponentSet(con for con in self.m.ccConstraints.values() if con.active)
+        return self.persistent
+
+    def updateSolver(self, solver):
+        """Send the objective, and the cuts added, deleted, activated or deactivated since the last solve, to the persistent solver."""
+        # The edge weights are mutable parameters, which the solver does not watch
+        solver.set_objective(self.m.OBJ)
+        active = ComponentSet(con for con in self.m.ccConstraints.values() if con.active)
+        for con in list(self.in_solver):
+            if con not in active:
+                solver.remove_constraint(con)
+                self.in_solver.remove(con)
+        for con in active:
+            if con not in self.in_solver:
+                solver.add_constraint(con)
+                self.in_solver.add(con)
+
+    def getCallbackSolver(self):
+        """Return the persistent solver if it supports lazy constraints, and None otherwise."""
+        solver = self.getPersistentSolver()
+        if solver is None or not hasattr(solver, 'cbLazy'):
+            return None
+        return solver
+
+    def solveLazy(self, solver):
+        """Solve once, adding subtour elimination constraints from a lazy-constraint callback."""
+        from gurobipy import GRB
+
+        m = self.m
+        Y = list(m.Y.values())
+        cuts = [0]
+
+        def subtour_callback(cb_m, cb_opt, cb_where):
+            # Check each new integer solution for disconnected components
+            if cb_where != GRB.Callback.MIPSOL:
+                return
+            cb_opt.cbGetSolution(Y)
+            for cc in self.findSubtours():
+                con = self.pool.add(cc)
+                if con is not None:
+                    cuts[0] += 1
+                else:
+                    # Gurobi can offer a solution that violates a lazy
+                    # constraint it was already given, so send it again
+                    con = self.pool.get(cc)
+                cb_opt.cbLazy(con)
+
+        # Cuts from earlier solves become ordinary constraints of the model
+        self.updateSolver(solver)
+        solver.set_gurobi_param('LazyConstraints', 1)
+        solver.set_callback(subtour_callback)
+        solver.solve(tee=False)
+        return 1, cuts[0]
+
+    def solveScenarios(self, weights, mode='iterative'):
+        """Solve the MST for each row of a matrix of edge weights.
+
+        Column k of weights is the weight of the k-th edge of m.edge_set.  The
+        subtour elimination constraints do not depend on the weights, so the model
+        and its CutPool are shared by all scenarios.  All the solves use one
+        persistent solver (see getPersistentSolver), if the solver has one, and
+        only the objective and the changes to the cuts are sent to it between
+        solves; otherwise the whole model is written for every solve.  Later
+        scenarios start with the cuts found so far, and usually need few or no
+        extra iterations.  Construct the class with max_age=None to keep every cut
+        active across scenarios.
+
+        This is a generator, yielding a dictionary for each scenario as soon as it
+        is solved."""
+        weights = numpy.asarray(weights, dtype=float)
+        if weights.ndim == 1:
+            weights = weights.reshape(1, -1)
+        if weights.shape[1] != len(self.m.edge_set):
+            raise ValueError('Expected %d edge weights per scenario, got %d' % (len(self.m.edge_set), weights.shape[1]))
+
+        dist = list(self.m.dist.values())
+        for k, row in enumerate(weights):
+            for param, w in zip(dist, row):
+                param.set_value(w)
+            stats = self.solve(mode=mode, persistent=True)
+            yield dict(stats, scenario=k, cost=pe.value(self.m.OBJ),
+                       tree=[e for e in self.m.edge_set if self.m.Y[e].value > .99])
+
+if __name__ == '__main__':
+    mst = MSTRowGeneration('mst.csv')
+    mst.solve()
+
+    mst.m.Y.pprint()
+    print(mst.labelEdges(e for e in mst.m.edge_set if mst.m.Y[e].value > .99))
+    print(mst.m.OBJ())
+
+    # Compare with a single branch-and-bound that adds the constraints lazily
+    lazy = MSTRowGeneration('mst.csv')
+    lazy.solve(mode='lazy')
 
-mst = MSTRowGeneration('mst.csv')
-mst.solve()
+    print('\n%-10s %8s %8s %10s %10s' % ('Mode', 'Solves', 'Cuts', 'Time (s)', 'Cost'))
+    for ans in (mst, lazy):
+        print('%-10s %8d %8d %10.3f %10g' % (ans.stats['mode'], ans.stats['iterations'], ans.stats['cuts'], ans.stats['time'], ans.m.OBJ()))
 
-mst.m.Y.pprint()
-print(mst.m.OBJ())
+    # Re-solve under perturbed edge weights, sharing the cut pool
+    numpy.random.seed(1000)
+    weights = mst.dist * numpy.random.uniform(0.5, 1.5, size=(5, len(mst.dist)))
+    print('\n%-10s %8s %8s %10s %10s' % ('Scenario', 'Solves', 'Cuts', 'Time (s)', 'Cost'))
+    for ans in mst.solveScenarios(weights):
+        print('%-10d %8d %8d %10.3f %10g' % (ans['scenario'], ans['iterations'], ans['cuts'], ans['time'], ans['cost']))
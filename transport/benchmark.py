@@ -0,0 +1,54 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import sys
+import time
+from pyomo.environ import *
+from instance import generate_instance, transport_costs, create_model
+from simplex import transportation_simplex
+
+def time_simplex(a, b, d):
+    """
+    Returns the cost, the time and the number of pivots of the
+    transportation simplex.
+    """
+    start = time.time()
+    result = transportation_simplex(a, b, transport_costs(d))
+    return result["cost"], time.time() - start, result["pivots"]
+
+def time_solver(a, b, d, solver):
+    """
+    Returns the cost, the time to build the Pyomo model and the
+    time to solve it with solver.
+    """
+    start = time.time()
+    model = create_model(a, b, d)
+    built = time.time()
+    SolverFactory(solver).solve(model)
+    return value(model.objective), built - start, time.time() - built
+
+if __name__ == "__main__":
+    # Usage: python benchmark.py [solver] [plants,markets ...]
+    solver = sys.argv[1] if len(sys.argv) > 1 else "glpk"
+    sizes = [tuple(int(v) for v in size.split(","))
+             for size in sys.argv[2:]] or \
+        [(10, 50), (100, 500), (200, 1000), (500, 2000), (1000, 1000)]
+    print("%7s %7s %14s %9s %8s %9s %9s %11s" % (
+        "Plants", "Markets", "Cost", "Simplex", "Pivots", "Build",
+        solver, "Difference"))
+    for m, n in sizes:
+        a, b, d = generate_instance(m, n)
+        cost, simplex_time, pivots = time_simplex(a, b, d)
+        solver_cost, build_time, solve_time = time_solver(a, b, d, solver)
+        print("%7d %7d %14.4f %9.3f %8d %9.3f %9.3f %11.2e" % (
+            m, n, cost, simplex_time, pivots, build_time, solve_time,
+            cost - solver_cost))
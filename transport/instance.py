@@ -0,0 +1,215 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import os
+import numpy
+import pandas
+from pyomo.environ import *
+from pyomo.core.expr.numeric_expr import LinearExpression
+
+def generate_instance(m, n, seed=1000):
+    """
+    Generates a random transportation problem with m canning
+    plants and n markets, placed at random in a 3000 by 3000
+    mile square. Returns the capacities a of the plants, the
+    demands b of the markets, which add up to about 90% of the
+    capacity, and the (m, n) distances d in thousands of miles.
+    """
+    rng = numpy.random.RandomState(seed)
+    plants = rng.rand(m, 2) * 3.0
+    markets = rng.rand(n, 2) * 3.0
+    b = rng.randint(100, 500, n).astype(float)
+    a = rng.uniform(0.5, 1.5, m)
+    a = numpy.ceil(a / a.sum() * b.sum() / 0.9)
+    d = numpy.sqrt(((plants[:, None, :] - markets[None, :, :])**2).sum(2))
+    return a, b, d
+
+def save_instance(filename, a, b, d):
+    """
+    Saves the capacities, demands and distances of a
+    transportation problem to a NumPy .npz file.
+    """
+    numpy.savez(filename, a=a, b=b, d=d)
+
+def load_instance(filename):
+    """
+    Returns the capacities, demands and distances saved with
+    save_instance.
+    """
+    with numpy.load(filename) as data:
+        return data["a"], data["b"], data["d"]
+
+def read_table(filename, columns):
+    """
+    Reads the given columns of a CSV, Parquet or Feather file
+    into a pandas DataFrame. Parquet and Feather files are read
+    through pyarrow, memory mapped, and only the given columns
+    are read; files with any other extension are read as CSV.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in (".parquet", ".pq"):
+        import pyarrow.parquet
+        return pyarrow.parquet.read_table(
+            filename, columns=columns, memory_map=True).to_pandas()
+    if ext in (".feather", ".arrow"):
+        import pyarrow.feather
+        return pyarrow.feather.read_table(
+            filename, columns=columns, memory_map=True).to_pandas()
+    return pandas.read_csv(filename, usecols=columns)
+
+def load_tables(plants_filename, markets_filename, distances_filename):
+    """
+    Returns the capacities a, demands b and (m, n) distances d
+    of a transportation problem given as three tables (see
+    read_table): the plants, with columns Plant and Capacity,
+    the markets, with columns Market and Demand, and the
+    distances, with columns Plant, Market and Distance and one
+    row for every pair. Also returns the names of the plants
+    and markets, in the order of a and b, for create_model.
+    """
+    plants = read_table(plants_filename, ["Plant", "Capacity"])
+    markets = read_table(markets_filename, ["Market", "Demand"])
+    distances = read_table(distances_filename,
+                           ["Plant", "Market", "Distance"])
+    row = pandas.Index(plants["Plant"]).get_indexer(distances["Plant"])
+    col = pandas.Index(markets["Market"]).get_indexer(distances["Market"])
+    if (row < 0).any() or (col < 0).any():
+        raise ValueError("The distances table has plants or markets that "
+                         "are not in the other tables")
+    d = numpy.full((len(plants), len(markets)), numpy.nan)
+    d[row, col] = distances["Distance"].to_numpy(dtype=float)
+    if numpy.isnan(d).any():
+        raise ValueError("The distances table has no distance for %d "
+                         "pairs" % (numpy.isnan(d).sum()))
+    return (plants["Capacity"].to_numpy(dtype=float),
+            markets["Demand"].to_numpy(dtype=float), d,
+            plants["Plant"].tolist(), markets["Market"].tolist())
+
+def save_tables(plants_filename, markets_filename, distances_filename,
+                a, b, d, plants=None, markets=None):
+    """
+    Saves a transportation problem as the three tables read by
+    load_tables, in the format given by the extension of each
+    file name. plants and markets are the names of the plants
+    and markets, 1, 2, ... by default.
+    """
+    m, n = d.shape
+    plants = list(plants) if plants is not None else list(range(1, m+1))
+    markets = list(markets) if markets is not None else list(range(1, n+1))
+    tables = [(plants_filename, {"Plant": plants, "Capacity": a}),
+              (markets_filename, {"Market": markets, "Demand": b}),
+              (distances_filename,
+               {"Plant": numpy.repeat(numpy.asarray(plants, dtype=object), n),
+                "Market": numpy.tile(numpy.asarray(markets, dtype=object), m),
+                "Distance": numpy.asarray(d, dtype=float).ravel()})]
+    for filename, columns in tables:
+        table = pandas.DataFrame(columns)
+        ext = os.path.splitext(filename)[1].lower()
+        if ext in (".parquet", ".pq"):
+            table.to_parquet(filename, index=False)
+        elif ext in (".feather", ".arrow"):
+            table.to_feather(filename)
+        else:
+            table.to_csv(filename, index=False)
+
+def transport_costs(d, f=90):
+    """
+    Returns the transport costs c(i,j) = f * d(i,j) / 1000 in
+    thousands of dollars per case, for all pairs at once.
+    """
+    return f * numpy.asarray(d, dtype=float) / 1000
+
+def create_model(a, b, d, f=90, plants=None, markets=None):
+    """
+    Creates the model of transport.py for the capacities a,
+    demands b and distances d (thousands of miles), with the
+    same component names. plants and markets are the names of
+    the plants and markets, 1, 2, ... by default. The costs are
+    computed with NumPy and read from the arrays by rules,
+    instead of a dictionary and a c_init call per pair.
+    """
+    m, n = d.shape
+    plants = list(plants) if plants is not None else list(range(1, m+1))
+    markets = list(markets) if markets is not None else list(range(1, n+1))
+    row = dict((p, k) for k, p in enumerate(plants))
+    col = dict((q, k) for k, q in enumerate(markets))
+    a, b = numpy.asarray(a, dtype=float), numpy.asarray(b, dtype=float)
+    c = transport_costs(d, f)
+
+    model = ConcreteModel()
+    model.i = Set(initialize=plants, doc='Canning plants')
+    model.j = Set(initialize=markets, doc='Markets')
+    model.a = Param(model.i, initialize=lambda model, i: a[row[i]],
+                    doc='Capacity of plant i in cases')
+    model.b = Param(model.j, initialize=lambda model, j: b[col[j]],
+                    doc='Demand at market j in cases')
+    model.d = Param(model.i, model.j,
+                    initialize=lambda model, i, j: d[row[i], col[j]],
+                    doc='Distance in thousands of miles')
+    model.f = Param(initialize=f,
+                    doc='Freight in dollars per case per thousand miles')
+    model.c = Param(model.i, model.j,
+                    initialize=lambda model, i, j: c[row[i], col[j]],
+                    doc='Transport cost in thousands of dollar per case')
+    model.x = Var(model.i, model.j, bounds=(0.0, None),
+                  doc='Shipment quantities in case')
+
+    def supply_rule(model, i):
+        return sum(model.x[i,j] for j in model.j) <= model.a[i]
+    model.supply = Constraint(model.i, rule=supply_rule,
+                              doc='Observe supply limit at plant i')
+    def demand_rule(model, j):
+        return sum(model.x[i,j] for i in model.i) >= model.b[j]
+    model.demand = Constraint(model.j, rule=demand_rule,
+                              doc='Satisfy demand at market j')
+    # x is indexed in the same (plant, market) order as c
+    def objective_rule(model):
+        return LinearExpression(constant=0,
+                                linear_coefs=c.ravel().tolist(),
+                                linear_vars=list(model.x.values()))
+    model.objective = Objective(rule=objective_rule, sense=minimize,
+                                doc='Define objective function')
+    return model
+
+def solve_transport(a, b, d, f=90, solver="simplex"):
+    """
+    Solves the transportation problem with capacities a,
+    demands b and distances d. solver is 'simplex', for the
+    transportation simplex in simplex.py, or the name of a
+    Pyomo solver, such as 'glpk', which solves the model from
+    create_model. Returns the cost and the (m, n) shipments.
+    """
+    if solver == "simplex":
+        from simplex import transportation_simplex
+        result = transportation_simplex(a, b, transport_costs(d, f))
+        return result["cost"], result["x"]
+    model = create_model(a, b, d, f)
+    SolverFactory(solver).solve(model)
+    x = numpy.array([v.value for v in model.x.values()]).reshape(d.shape)
+    return value(model.objective), x
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Usage: python instance.py [m n [solver]]
+    m = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    solver = sys.argv[3] if len(sys.argv) > 3 else "simplex"
+
+    a, b, d = generate_instance(m, n)
+    save_instance("transport.npz", a, b, d)
+    start = time.time()
+    cost, x = solve_transport(*load_instance("transport.npz"),
+                              solver=solver)
+    print("%d plants, %d markets: cost %.4f with %s in %.3f seconds"
+          % (m, n, cost, solver, time.time() - start))
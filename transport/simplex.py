@@ -0,0 +1,266 @@
+#  ___________________________________________________________________________
+#
+#  Pyomo: Python Optimization Modeling Objects
+#  Copyright (c) 2015-2025
+#  National Technology and Engineering Solutions of Sandia, LLC
+#  Under the terms of Contract DE-NA0003525 with National Technology and
+#  Engineering Solutions of Sandia, LLC, the U.S. Government retains certain
+#  rights in this software.
+#  This software is distributed under the 3-clause BSD License.
+#  ___________________________________________________________________________
+
+
+import time
+import numpy
+
+def _balance(a, b, c):
+    # transport.py only asks for at most a[i] from each plant, so
+    # the excess capacity goes to a dummy market with no cost
+    excess = a.sum() - b.sum()
+    if excess < -1e-9 * max(1.0, b.sum()):
+        raise ValueError("The total demand exceeds the total capacity")
+    if excess <= 0:
+        return a, b, c
+    return (a, numpy.append(b, excess),
+            numpy.hstack([c, numpy.zeros((len(a), 1))]))
+
+def _advance(order, ptr, active, lines):
+    # move ptr forward, for all the given lines, to the first entry of
+    # order that is still active
+    while lines.size:
+        lines = lines[~active[order[lines, ptr[lines]]]]
+        ptr[lines] += 1
+
+def _sorted(c):
+    # the columns of every row of c by increasing cost, with the costs,
+    # followed by a sentinel column (index n, cost inf) that is never
+    # removed
+    m, n = c.shape
+    order = numpy.empty((m, n+1), dtype=numpy.int64)
+    order[:, :n] = numpy.argsort(c, axis=1)
+    order[:, n] = n
+    cost = numpy.full((m, n+1), numpy.inf)
+    cost[:, :n] = numpy.take_along_axis(c, order[:, :n], axis=1)
+    return order, cost
+
+def vogel(a, b, c):
+    """
+    Returns an initial basic solution of the balanced
+    transportation problem with supplies a, demands b and costs
+    c, from Vogel's approximation method, as a list of m+n-1
+    (i, j, amount) basic cells. The rows and columns are sorted
+    by cost once, and the two cheapest remaining entries of
+    each are tracked with pointers, so the penalties of all the
+    rows and columns are updated with array operations instead
+    of searching the cost matrix on every step.
+    """
+    m, n = c.shape
+    supply = numpy.array(a, dtype=float)
+    demand = numpy.array(b, dtype=float)
+    row_order, row_cost = _sorted(c)
+    col_order, col_cost = _sorted(c.T)
+    row_active = numpy.ones(m+1, dtype=bool)
+    col_active = numpy.ones(n+1, dtype=bool)
+    # first and second cheapest active entry of every row and column
+    r1 = numpy.zeros(m, dtype=numpy.int64)
+    r2 = numpy.ones(m, dtype=numpy.int64)
+    c1 = numpy.zeros(n, dtype=numpy.int64)
+    c2 = numpy.ones(n, dtype=numpy.int64)
+    rows, cols = numpy.arange(m), numpy.arange(n)
+
+    cells = []
+    while rows.size and cols.size:
+        _advance(row_order, r1, col_active, rows)
+        r2[rows] = numpy.maximum(r2[rows], r1[rows]+1)
+        _advance(row_order, r2, col_active, rows)
+        _advance(col_order, c1, row_active, cols)
+        c2[cols] = numpy.maximum(c2[cols], c1[cols]+1)
+        _advance(col_order, c2, row_active, cols)
+
+        row_penalty = row_cost[rows, r2[rows]] - row_cost[rows, r1[rows]]
+        col_penalty = col_cost[cols, c2[cols]] - col_cost[cols, c1[cols]]
+        k, l = numpy.argmax(row_penalty), numpy.argmax(col_penalty)
+        if row_penalty[k] >= col_penalty[l]:
+            i = rows[k]
+            j = row_order[i, r1[i]]
+        else:
+            j = cols[l]
+            i = col_order[j, c1[j]]
+
+        amount = min(supply[i], demand[j])
+        supply[i] -= amount
+        demand[j] -= amount
+        cells.append((int(i), int(j), amount))
+        # exactly one row or column leaves on every step, so the basis
+        # has m+n-1 cells, some of them 0 when both are used up
+        if cols.size == 1 or (supply[i] <= demand[j] and rows.size > 1):
+            row_active[i] = False
+            rows = rows[rows != i]
+        else:
+            col_active[j] = False
+            cols = cols[cols != j]
+    return cells
+
+def _tree(c, adj, m):
+    # potentials u, v with u[i] + v[j] == c[i,j] on the basic cells,
+    # and the parent and depth of every node in the basis tree; rows
+    # are nodes 0..m-1 and columns nodes m..m+n-1
+    nodes = len(adj)
+    potential = [0.0] * nodes
+    parent = [-1] * nodes
+    depth = [0] * nodes
+    parent[0] = 0
+    queue = [0]
+    for node in queue:
+        for other in adj[node]:
+            if other != parent[node]:
+                parent[other] = node
+                depth[other] = depth[node] + 1
+                if node < m:
+                    potential[other] = c[node, other-m] - potential[node]
+                else:
+                    potential[other] = c[other, node-m] - potential[node]
+                queue.append(other)
+    if len(queue) != nodes:
+        raise RuntimeError("The basis is not a spanning tree")
+    potential = numpy.array(potential)
+    return potential[:m], potential[m:], parent, depth
+
+def _rehang(adj, m, parent, depth, u, v, node, other, shift):
+    # after a pivot, the nodes that were cut off from the root by the
+    # leaving cell hang from node, which is joined to other by the
+    # entering cell: update their parents and depths, and shift their
+    # potentials so that u[i] + v[j] == c[i,j] holds on that cell too
+    parent[node] = other
+    depth[node] = depth[other] + 1
+    queue = [node]
+    for x in queue:
+        for y in adj[x]:
+            if y != parent[x]:
+                parent[y] = x
+                depth[y] = depth[x] + 1
+                queue.append(y)
+    queue = numpy.array(queue)
+    rows, cols = queue[queue < m], queue[queue >= m] - m
+    if node < m:
+        u[rows] += shift
+        v[cols] -= shift
+    else:
+        u[rows] -= shift
+        v[cols] += shift
+
+def _cycle(i, j, m, parent, depth):
+    # the basic cells on the path from column j back to row i, which
+    # close a cycle with the entering cell (i, j)
+    x, y = i, m+j
+    left, right = [x], [y]
+    while x != y:
+        if depth[x] >= depth[y]:
+            x = parent[x]
+            left.append(x)
+        else:
+            y = parent[y]
+            right.append(y)
+    path = right + left[-2::-1]
+    return [(p, q-m) if p < m else (q, p-m)
+            for p, q in zip(path[:-1], path[1:])]
+
+def transportation_simplex(a, b, c, block=None, max_pivots=None, tol=1e-9):
+    """
+    Solves the transportation problem of transport.py: minimize
+    sum c[i,j]*x[i,j] with at most a[i] shipped from each plant
+    and at least b[j] to each market, starting from Vogel's
+    approximation and improving it with MODI (u-v) pivots along
+    stepping-stone cycles of the basis tree. Reduced costs are
+    priced a block of rows at a time (by default about 8000
+    entries), and the first block with a negative one gives the
+    entering cell; after a pivot only the part of the tree cut
+    off by the leaving cell gets new potentials.
+    Returns a dictionary with the cost, the (m, n) shipments x,
+    the plant and market potentials u and v (the duals of the
+    supply and demand rows, up to a constant), the cost of the
+    Vogel start, the number of pivots and the time taken.
+    """
+    begin = time.time()
+    a = numpy.asarray(a, dtype=float)
+    b = numpy.asarray(b, dtype=float)
+    c = numpy.asarray(c, dtype=float)
+    m0, n0 = c.shape
+    a, b, c = _balance(a, b, c)
+    m, n = c.shape
+    ranking = c
+    if n > n0:
+        # the zero costs of the dummy market would set the penalties
+        # of Vogel's method, so it is used last
+        ranking = c.copy()
+        ranking[:, n0] = c.max() + 1
+    if block is None:
+        block = max(1, (1 << 13) // n)
+
+    flow = {}
+    adj = [set() for k in range(m+n)]
+    for i, j, amount in vogel(a, b, ranking):
+        flow[i, j] = amount
+        adj[i].add(m+j)
+        adj[m+j].add(i)
+    initial = sum(c[i, j]*amount for (i, j), amount in flow.items())
+
+    u, v, parent, depth = _tree(c, adj, m)
+    pivots = 0
+    blocks = range(0, m, block)
+    first = 0
+    while max_pivots is None or pivots < max_pivots:
+        entering = None
+        for k in range(len(blocks)):
+            # continue from the block where the last entering cell was
+            rows = blocks[(first + k) % len(blocks)]
+            reduced = c[rows:rows+block] - u[rows:rows+block, None] - v
+            cell = numpy.argmin(reduced)
+            if reduced.flat[cell] < -tol:
+                entering = (rows + cell // n, cell % n)
+                first = (first + k) % len(blocks)
+                break
+        if entering is None:
+            break
+
+        i, j = entering
+        shift = c[i, j] - u[i] - v[j]
+        path = _cycle(i, j, m, parent, depth)
+        # the cells on the path are alternately decreased and increased
+        minus, plus = path[0::2], path[1::2]
+        theta, leaving = min((flow[cell], cell) for cell in minus)
+        for cell in minus:
+            flow[cell] -= theta
+        for cell in plus:
+            flow[cell] += theta
+        flow[i, j] = theta
+        del flow[leaving]
+        adj[leaving[0]].discard(m+leaving[1])
+        adj[m+leaving[1]].discard(leaving[0])
+        adj[i].add(m+j)
+        adj[m+j].add(i)
+        # the deeper end of the leaving cell is the root of the part
+        # of the tree that was cut off, and one end of the entering
+        # cell is in that part
+        p, q = leaving[0], m+leaving[1]
+        cut = p if parent[p] == q else q
+        x = i
+        while x != cut and x != parent[x]:
+            x = parent[x]
+        if x == cut:
+            _rehang(adj, m, parent, depth, u, v, i, m+j, shift)
+        else:
+            _rehang(adj, m, parent, depth, u, v, m+j, i, shift)
+        pivots += 1
+
+    x = numpy.zeros((m0, n0))
+    for (i, j), amount in flow.items():
+        if j < n0:
+            x[i, j] = amount
+    return {"cost": float((c[:, :n0] * x).sum()),
+            "x": x,
+            "u": u,
+            "v": v[:n0],
+            "initial_cost": float(initial),
+            "pivots": pivots,
+            "time": time.time() - begin}